@@ -0,0 +1,145 @@
+"""
+Benchmark the JSON-RPC transport of LanguageServerHandler against the former one (readline framing, stdlib json,
+one task per message kept until the server stops) over a long session with a fake server answering in memory:
+each request gets a definition response after a few $/progress and publishDiagnostics notifications.
+Run `python -m benchmarks.bench_lsp_transport` from TestUpdater.
+"""
+
+import re, json, time, asyncio, argparse, tracemalloc
+from utils.multilspy.lsp_protocol_handler import server
+from utils.multilspy.lsp_protocol_handler.server import LanguageServerHandler, ProcessLaunchInfo, content_length
+
+REQUEST_ID = re.compile(rb'"id":(\d+)')
+
+
+class LegacyLanguageServerHandler(LanguageServerHandler):
+    """
+    The read loop of LanguageServerHandler before the frame parser, the finished tasks are never removed.
+    """
+
+    async def run_forever(self) -> bool:
+        self.legacy_tasks = {}
+        try:
+            while self.process and self.process.stdout and not self.process.stdout.at_eof():
+                line = await self.process.stdout.readline()
+                if not line:
+                    continue
+                try:
+                    num_bytes = content_length(line)
+                except ValueError:
+                    continue
+                if num_bytes is None:
+                    continue
+                while line and line.strip():
+                    line = await self.process.stdout.readline()
+                if not line:
+                    continue
+                body = await self.process.stdout.readexactly(num_bytes)
+                self.legacy_tasks[len(self.legacy_tasks)] = asyncio.get_event_loop().create_task(self._legacy_body(body))
+        except (BrokenPipeError, ConnectionResetError, server.StopLoopException):
+            pass
+        return self._received_shutdown
+
+    async def _legacy_body(self, body: bytes) -> None:
+        await self._receive_payload(json.loads(body))
+
+
+def frame(payload) -> bytes:
+    return b"".join(server.create_message(payload))
+
+
+class FakeStdin:
+    """
+    Answer each request written by the client on the stdout of the fake server.
+    """
+
+    def __init__(self, stdout: asyncio.StreamReader, notifications: int):
+        self.stdout = stdout
+        self.notifications = [
+            frame({"jsonrpc": "2.0", "method": "$/progress", "params": {"token": "t", "value": {"kind": "report", "percentage": i}}})
+            if i % 2 else
+            frame({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics", "params": {
+                "uri": "file:///repo/src/test/java/FooTest.java", "diagnostics": [{"message": "x" * 80, "severity": 1}] * 4}})
+            for i in range(notifications)
+        ]
+
+    def write(self, data: bytes) -> None:
+        match = REQUEST_ID.search(data)
+        if match is None:
+            return
+        response = {"jsonrpc": "2.0", "id": int(match.group(1)), "result": [{
+            "uri": "file:///repo/src/main/java/org/example/service/Foo.java",
+            "range": {"start": {"line": 41, "character": 16}, "end": {"line": 41, "character": 24}}}]}
+        self.stdout.feed_data(b"".join(self.notifications) + frame(response))
+
+    def writelines(self, lines) -> None:
+        self.write(b"".join(lines))
+
+    async def drain(self) -> None:
+        pass
+
+
+class FakeProcess:
+    def __init__(self, notifications: int):
+        self.stdout = asyncio.StreamReader()
+        self.stdin = FakeStdin(self.stdout, notifications)
+        self.stderr = None
+        self.returncode = None
+
+
+async def session(handler_class, requests: int, concurrency: int, notifications: int):
+    """
+    Send `requests` definition requests, `concurrency` at once, and return the seconds, the tasks left and the
+    memory traced at the end of the session.
+    """
+    handler = handler_class(ProcessLaunchInfo(cmd=""))
+    handler.process = FakeProcess(notifications)
+    handler.loop = asyncio.get_running_loop()
+
+    async def do_nothing(params):
+        return
+
+    handler.on_notification("$/progress", do_nothing)
+    handler.on_notification("textDocument/publishDiagnostics", do_nothing)
+    reader = asyncio.get_running_loop().create_task(handler.run_forever())
+    params = {"textDocument": {"uri": "file:///repo/src/test/java/FooTest.java"}, "position": {"line": 10, "character": 5}}
+
+    async def client(n: int):
+        for _ in range(n):
+            await handler.send_request("textDocument/definition", params)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client(requests // concurrency) for _ in range(concurrency)])
+    # let the notification tasks of the last responses finish
+    for _ in range(10):
+        await asyncio.sleep(0)
+    seconds = time.perf_counter() - start
+    tasks = len(getattr(handler, "legacy_tasks", handler.tasks))
+    memory = tracemalloc.get_traced_memory()[0]
+    handler.process.stdout.feed_eof()
+    await reader
+    return seconds, tasks, memory
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000, help='Requests of the session.')
+    parser.add_argument("--concurrency", type=int, default=16, help='Requests in flight.')
+    parser.add_argument("--notifications", type=int, default=4, help='Notifications sent before each response.')
+    parser.add_argument("--json", action="store_true", help='Use the stdlib json even if orjson is installed.')
+    args = parser.parse_args()
+    if args.json:
+        server.orjson = None
+    messages = args.requests * (args.notifications + 1)
+    print(f"{args.requests} requests, {messages} messages received, orjson: {server.orjson is not None}")
+    for handler_class in (LegacyLanguageServerHandler, LanguageServerHandler):
+        seconds, tasks, _ = asyncio.run(session(handler_class, args.requests, args.concurrency, args.notifications))
+        # the memory is traced in a second session, tracemalloc slows it down
+        tracemalloc.start()
+        _, _, memory = asyncio.run(session(handler_class, args.requests, args.concurrency, args.notifications))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(
+            f"{handler_class.__name__:<28} {messages / seconds:10.0f} messages/s  "
+            f"{tasks:7d} tasks kept  {memory / 2**20:7.1f}MB at the end  {peak / 2**20:7.1f}MB peak"
+        )
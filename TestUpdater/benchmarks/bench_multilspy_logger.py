@@ -0,0 +1,113 @@
+"""
+Benchmark MultilspyLogger.log against the former implementation (inspect.getouterframes and a pydantic LogLine)
+on the messages logged while JDTLS starts: its window/logMessage notifications and the traced payloads.
+Run `python -m benchmarks.bench_multilspy_logger` from TestUpdater, `--trace` replays a recorded trace instead
+of the synthetic one, one JSON payload (or plain message) per line.
+"""
+
+import io, json, time, random, inspect, logging, argparse, warnings
+from datetime import datetime
+from pydantic import BaseModel
+from utils.multilspy.multilspy_logger import MultilspyLogger
+
+
+class LogLine(BaseModel):
+    """
+    Line of the former Multilspy log
+    """
+
+    time: str
+    level: str
+    caller_file: str
+    caller_name: str
+    caller_line: int
+    message: str
+
+
+class LegacyMultilspyLogger(MultilspyLogger):
+    """
+    MultilspyLogger.log before the caller was read with sys._getframe.
+    """
+
+    def log(self, debug_message: str, level: int, sanitized_error_message: str = "") -> None:
+        debug_message = debug_message.replace("'", '"').replace("\n", " ")
+        sanitized_error_message = sanitized_error_message.replace("'", '"').replace("\n", " ")
+        curframe = inspect.currentframe()
+        calframe = inspect.getouterframes(curframe, 2)
+        debug_log_line = LogLine(
+            time=str(datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+            level=logging.getLevelName(level),
+            caller_file=calframe[1][1].split("/")[-1],
+            caller_name=calframe[1][3],
+            caller_line=calframe[1][2],
+            message=debug_message,
+        )
+        with warnings.catch_warnings():
+            # BaseModel.json is deprecated by pydantic 2
+            warnings.simplefilter("ignore")
+            self.logger.log(level=level, msg=debug_log_line.json())
+
+
+def startup_trace(n: int, seed: int = 0) -> list:
+    """
+    Payloads shaped like a JDTLS startup: Maven import logs, progress and status notifications.
+    """
+    rng = random.Random(seed)
+    payloads = []
+    for i in range(n):
+        kind = rng.random()
+        if kind < 0.5:
+            payloads.append({"jsonrpc": "2.0", "method": "window/logMessage", "params": {
+                "type": 3, "message": f"{datetime.now()} Importing Maven project(s) module-{i % 40}: " + "x" * rng.randint(40, 400)}})
+        elif kind < 0.8:
+            payloads.append({"jsonrpc": "2.0", "method": "$/progress", "params": {
+                "token": f"tok-{i % 7}", "value": {"kind": "report", "message": f"{i}/{n} Building", "percentage": i * 100 // n}}})
+        elif kind < 0.9:
+            payloads.append({"jsonrpc": "2.0", "method": "language/status", "params": {"type": "Starting", "message": f"{i * 100 // n}% Starting Java Language Server"}})
+        else:
+            payloads.append({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics", "params": {
+                "uri": f"file:///repo/src/main/java/Foo{i}.java", "diagnostics": [{"message": "y" * 80}] * rng.randint(0, 20)}})
+    return payloads
+
+def read_trace(path: str) -> list:
+    payloads = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    payloads.append(json.loads(line))
+                except json.JSONDecodeError:
+                    payloads.append(line)
+    return payloads
+
+
+def replay(logger: MultilspyLogger, payloads: list) -> float:
+    """
+    Log the payloads as the language server does: the trace of each payload, and the window/logMessage handler.
+    """
+    start = time.perf_counter()
+    for payload in payloads:
+        logger.log(f"LSP: server -> client: {str(payload)}", logging.DEBUG)
+        if isinstance(payload, dict) and payload.get("method") == "window/logMessage":
+            logger.log(f"LSP: window/logMessage: {payload['params']}", logging.INFO)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trace", type=str, default=None, help='Recorded trace, one payload per line.')
+    parser.add_argument("--messages", type=int, default=20000, help='Messages of the synthetic trace.')
+    parser.add_argument("--repeat", type=int, default=3, help='Runs of each case, the best one is kept.')
+    args = parser.parse_args()
+    payloads = read_trace(args.trace) if args.trace else startup_trace(args.messages)
+
+    multilspy = logging.getLogger("multilspy")
+    print(f"{len(payloads)} payloads")
+    # no handler as in the pipelines, then a DEBUG handler writing to memory
+    for case, handlers in (("no handler", []), ("DEBUG handler", [logging.StreamHandler(io.StringIO())])):
+        multilspy.handlers = handlers
+        multilspy.propagate = not handlers
+        for logger in (LegacyMultilspyLogger(), MultilspyLogger()):
+            best = min(replay(logger, payloads) for _ in range(args.repeat))
+            print(f"{case:<14} {type(logger).__name__:<22} {best:8.3f}s {best / len(payloads) * 1e6:8.1f}us/payload")
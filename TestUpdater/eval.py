@@ -2,8 +2,10 @@ import json, os, subprocess, multiprocessing
 import pandas as pd
 from utils.gitter import setup_repo, UpdateRepo
 from utils.logger import MyLogger
-from pipeline_helper import substitute_code, add_imports
-from utils.configs import mvn_dict, java_dict, FILE_BASE, REPO_BASE, TIME_ZONE
+from pipeline_helper import substitute_code, add_imports, warm_build_key, can_build_warm, record_build, rejects_fast_build, mvn_command, build_env, discard_build, cached_build_meta, MVN_WARM
+from utils.build_meta import module_of, reactor_args
+from utils.build_result import run_maven
+from utils.configs import FILE_BASE, REPO_BASE, TIME_ZONE, WARM_BUILD
 
 INPUT_BASE = "./output/pipelinedeepseek"
 csv_file_path = "coverage/pipeline.csv"
@@ -34,7 +36,7 @@ MVN_SKIPS = [
 ]
 
 
-def build_test(exp: dict, build_pass, test_pass, import_error, output_csv, logger):
+def build_test(exp: dict, build_pass, test_pass, import_error, output_csv, logger, warm=WARM_BUILD):
 
     logger.info("##" * 5 + " [" + str(exp["test_id"]) + "] " + "##" * 5)
 
@@ -47,9 +49,7 @@ def build_test(exp: dict, build_pass, test_pass, import_error, output_csv, logge
         classname.split("src/test/java/")[-1].replace(".java", "").replace("/", ".")
     )
     test_case = f"{classname}#{methodname}"
-    module = changed_test.split("src/test/java/")[0]
-    if module.endswith("/"):
-        module = module[:-1]
+    module = module_of(changed_test)
     logger.info(f"Test class: {classname}")
 
     repo: UpdateRepo = setup_repo(
@@ -64,13 +64,7 @@ def build_test(exp: dict, build_pass, test_pass, import_error, output_csv, logge
     if imports:
         add_imports(repo, exp, imports)
 
-    os.chdir(repo_root)
-    original_path = os.environ.get("PATH")
-
-    os.environ["JAVA_HOME"] = java_dict[exp["tgt_java_version"]]
-    os.environ["PATH"] = os.environ["JAVA_HOME"] + "/bin:" + os.environ["PATH"]
-    os.environ["MAVEN_HOME"] = mvn_dict[exp["tgt_maven_version"]]
-    os.environ["PATH"] = os.environ["MAVEN_HOME"] + "/bin:" + os.environ["PATH"]
+    env = build_env(exp)
 
     if exp["repo_name"] == "Aiven-Open/klaw" or exp["repo_name"] == "shred/acme4j":
         cmd = [
@@ -96,38 +90,58 @@ def build_test(exp: dict, build_pass, test_pass, import_error, output_csv, logge
     else:
         cmd = ["mvn", "-T2C", "clean", "test", f"-Dtest={classname}"]
 
-    if module:
-        cmd = cmd[:2] + ["-pl", f"{module}", "--also-make"] + cmd[2:]
+    # the upstream modules cached by the pipeline, see pipeline_helper.build_test
+    cmd = cmd[:2] + reactor_args(module, cached_build_meta(exp, repo_root, module)) + cmd[2:]
     cmd.extend(MVN_SKIPS)
-    logger.info(" ".join(cmd))
+    mvn = mvn_command(exp["tgt_java_version"], exp["tgt_maven_version"])
+    cmd = mvn + cmd[1:]
+    # keep target/ between the builds of the same commit, see pipeline_helper.build_test
+    key = warm_build_key(exp, module)
+    warm = warm and can_build_warm(repo_root, key)
+    # a warm build must not append to the coverage of the former tests
+    warm_cmd = [arg for arg in cmd if arg != "clean"] + MVN_WARM + ["-Djacoco.append=false"]
     try:
-        # mvn test
-        proc = subprocess.run(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=600  # 10 min
-        )
-        output = proc.stdout.decode()
-        lines = output.splitlines()
-        test_info = [line for line in lines if "Tests run" in line]
-        build_info = [line for line in lines if "BUILD SUCCESS" in line]
-        error_info = [line for line in lines if "[ERROR]" in line]
+        for build_cmd in ([warm_cmd, cmd] if warm else [cmd]):
+            logger.info(" ".join(build_cmd))
+            # mvn test
+            try:
+                result = run_maven(
+                    build_cmd,
+                    cwd=repo_root,
+                    env=env,
+                    timeout=600,  # 10 min
+                    report_dirs=[os.path.join(repo_root, module, "target/surefire-reports")],
+                    abort_on_compile_error=os.path.join(repo_root, module, "src/test"),
+                    project=module or exp["repo_name"],
+                )
+            except subprocess.TimeoutExpired:
+                discard_build(repo_root, mvn, env)
+                raise
+            if result.finished:
+                record_build(repo_root, key)
+            else:
+                discard_build(repo_root, mvn, env)
+            if result.returncode == 0 or build_cmd is cmd or not rejects_fast_build(result.error_info, result.test_info, changed_test.split("#")[0]):
+                break
+            logger.info("Warm build is rejected, rebuild from clean.")
         cannot_find_symbol = [
-            line for line in error_info if "cannot find symbol" in line
+            line for line in result.error_info if "cannot find symbol" in line
         ]
         logger.info(f"================{exp['test_id']}==================")
-        logger.info(test_info)
-        logger.info(build_info)
-        logger.info(error_info)
+        logger.info(result.test_info)
+        logger.info(result.build_info)
+        logger.info(result.error_info)
         logger.info("\n")
 
-        if len(build_info) > 0:
+        if result.build_success:
             test_pass.append(exp["test_id"])
             build_pass.append(exp["test_id"])
-        elif len(test_info) > 0:
+        elif result.tests_ran:
             build_pass.append(exp["test_id"])
         if len(cannot_find_symbol) > 0:
             import_error.append(exp["test_id"])
 
-        if proc.returncode == 0:
+        if result.returncode == 0:
             jacoco_csv_path = os.path.join(
                 repo_root, f"{module}", "target/site/jacoco/jacoco.csv"
             )
@@ -150,9 +164,9 @@ def build_test(exp: dict, build_pass, test_pass, import_error, output_csv, logge
             output_csv.append([])
         logger.info("\n")
         # reset
-        os.environ["PATH"] = original_path
         git_reset = subprocess.run(
             ["git", "reset", "--hard", "HEAD"],
+            cwd=repo_root,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
         )
@@ -165,7 +179,7 @@ def build_test(exp: dict, build_pass, test_pass, import_error, output_csv, logge
         logger.error(e)
         raise
 
-    return proc.returncode, error_info, test_info
+    return result
 
 
 def main(input_file: str):
@@ -0,0 +1,174 @@
+"""
+    Prompts and invocation of the LLM stages: info, filter, generate, verify and basic answer.
+    Every stage has a sync form (invoke) and an asyncio form (ainvoke, the agen_* functions), `abatch` runs
+    one stage on many inputs concurrently.
+    Responses are cached on disk by `llm_cache`, set `llm_cache.bypass = True` to always query the model.
+    Requests sent to the model are throttled by the rate limiter of its endpoint (`utils.llm.rate_limits`),
+    which also bounds the requests in flight of the process (`utils.llm.inflight_limits`), whatever the event loop.
+    `asample` draws several alternative answers of one prompt, the samples after the first one are
+    drawn at SPECULATIVE_TEMPERATURE and cached under their index and that temperature.
+"""
+import asyncio
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.messages import AIMessage
+from utils.llm import get_rate_limiter
+from utils.ratelimit import MAX_RETRIES, estimate_tokens, retry_after
+from utils.llm_cache import LLMCache
+from utils.configs import LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES, SPECULATIVE_TEMPERATURE
+from prompt import *
+
+llm_cache = LLMCache(LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES)
+
+def info_prompt(focal_diff, test_src):
+    query = {
+        "FOCAL_DIFF": focal_diff,
+        "TEST_SRC": test_src
+    }
+    prompt_analyse = ChatPromptTemplate.from_messages([
+        ("system", system_prompt_1),
+        ("user", prompt_1_0)
+    ])
+    return prompt_analyse, query
+
+def filter_prompt(focal_diff: str, test_src: str, context: str, answer: str):
+    query = {
+        "FOCAL_DIFF": focal_diff,
+        "TEST_SRC": test_src,
+        "CONTEXT": context
+    }
+    prompt_filter = ChatPromptTemplate.from_messages([
+        ("system", system_prompt_1),
+        ("user", prompt_1_0),
+        AIMessage(content=answer),
+        ("user", prompt_1_1)
+    ])
+    return prompt_filter, query
+
+def generate_prompt(prod_diff, test_src, context):
+    query = {
+        "FOCAL_DIFF": prod_diff,
+        "TEST_SRC": test_src,
+        "CONTEXT": context
+    }
+    prompt_generate = ChatPromptTemplate.from_messages([
+        ("system", system_prompt_2),
+        ("user", prompt_2)
+    ])
+    return prompt_generate, query
+
+def verify_prompt(prod_diff, test_src, context: str, error_info: str, answer_2: str):
+    query = {
+        "FOCAL_DIFF": prod_diff,
+        "TEST_SRC": test_src,
+        "CONTEXT": context,
+        "ERRORINFO": error_info
+    }
+    prompt_verify = ChatPromptTemplate.from_messages([
+        ("system", system_prompt_2),
+        ("user", prompt_2),
+        AIMessage(content=answer_2),
+        ("user", prompt_3)
+    ])
+    return prompt_verify, query
+
+def basic_prompt(prod_diff, test_src, context: str, answer_2: str):
+    query = {
+        "FOCAL_DIFF": prod_diff,
+        "TEST_SRC": test_src,
+        "CONTEXT": context
+    }
+    prompt_basic = ChatPromptTemplate.from_messages([
+        ("system", system_prompt_2),
+        ("user", prompt_2),
+        AIMessage(content=answer_2),
+        ("user", basic_ans_prompt)
+    ])
+    return prompt_basic, query
+
+def _temperature(model, sample: int) -> float:
+    # the first answer is drawn at the temperature of the model, the alternative samples hotter
+    return SPECULATIVE_TEMPERATURE if sample else model.temperature
+
+def _chain(model, sample: int):
+    if sample:
+        model = model.bind(temperature=_temperature(model, sample))
+    return model | StrOutputParser()
+
+def invoke(model, prompt: ChatPromptTemplate, query: dict, sample: int = 0) -> str:
+    messages = prompt.format_messages(**query)
+    key = llm_cache.make_key(model, messages, sample, _temperature(model, sample))
+    res = llm_cache.get(key)
+    if res is None:
+        chain = _chain(model, sample)
+        limiter = get_rate_limiter(model)
+        tokens = sum(estimate_tokens(m.content) for m in messages)
+        for attempt in range(MAX_RETRIES + 1):
+            limiter.acquire(tokens)
+            try:
+                res = chain.invoke(messages)
+                break
+            except Exception as e:
+                wait = retry_after(e)
+                if wait is None or attempt == MAX_RETRIES:
+                    raise
+                limiter.block(wait)
+            finally:
+                limiter.release()
+        limiter.consume_tokens(estimate_tokens(res))
+        llm_cache.put(key, res)
+    return res
+
+async def ainvoke(model, prompt: ChatPromptTemplate, query: dict, sample: int = 0) -> str:
+    messages = prompt.format_messages(**query)
+    key = llm_cache.make_key(model, messages, sample, _temperature(model, sample))
+    res = llm_cache.get(key)
+    if res is None:
+        chain = _chain(model, sample)
+        limiter = get_rate_limiter(model)
+        tokens = sum(estimate_tokens(m.content) for m in messages)
+        for attempt in range(MAX_RETRIES + 1):
+            await limiter.aacquire(tokens)
+            try:
+                res = await chain.ainvoke(messages)
+                break
+            except Exception as e:
+                wait = retry_after(e)
+                if wait is None or attempt == MAX_RETRIES:
+                    raise
+                limiter.block(wait)
+            finally:
+                limiter.release()
+        limiter.consume_tokens(estimate_tokens(res))
+        llm_cache.put(key, res)
+    return res
+
+async def asample(model, build_prompt, args: tuple, k: int) -> list[str]:
+    """
+    Draw `k` alternative answers of one stage concurrently, e.g. `await asample(model, generate_prompt, (diff, src, ctx), 4)`.
+    The first answer is the one of `invoke`.
+    """
+    prompt, query = build_prompt(*args)
+    return await asyncio.gather(*(ainvoke(model, prompt, query, sample=i) for i in range(k)))
+
+async def abatch(model, build_prompt, args_list: list[tuple]) -> list[str]:
+    """
+    Run one stage on many inputs concurrently, e.g. `await abatch(model, generate_prompt, [(diff, src, ctx), ...])`.
+    Results are returned in the order of `args_list`.
+    """
+    return await asyncio.gather(*(ainvoke(model, *build_prompt(*args)) for args in args_list))
+
+async def agen_info(model, focal_diff, test_src) -> str:
+    return await ainvoke(model, *info_prompt(focal_diff, test_src))
+
+async def agen_filter(model, focal_diff: str, test_src: str, context: str, answer: str) -> str:
+    return await ainvoke(model, *filter_prompt(focal_diff, test_src, context, answer))
+
+async def agen_test(model, prod_diff, test_src, context) -> str:
+    return await ainvoke(model, *generate_prompt(prod_diff, test_src, context))
+
+async def averify_code(model, prod_diff, test_src, context: str, error_info: str, answer_2: str) -> str:
+    return await ainvoke(model, *verify_prompt(prod_diff, test_src, context, error_info, answer_2))
+
+async def abasic_answer(model, prod_diff, test_src, context: str, answer_2: str) -> str:
+    return await ainvoke(model, *basic_prompt(prod_diff, test_src, context, answer_2))
@@ -1,10 +1,18 @@
 import os, json, re, difflib, subprocess
 from utils.multilspy import SyncLanguageServer
 from utils.multilspy.multilspy_utils import TextUtils
+from utils.multilspy.multilspy_exceptions import MultilspyTimeoutError
 from utils.gitter import UpdateRepo, setup_repo
-from utils.parser import extract_method_from_line, extract_class_from_line, extract_class_varibles
+from utils.parser import extract_method_from_line, extract_class_from_line, extract_class_varibles, get_code_without_comments
+from utils.formatter import formatted_java_code
 from utils.logger import logger
-from utils.configs import REPO_BASE, mvn_dict, java_dict
+from utils.configs import REPO_BASE, BUILD_META_BASE, DEFINITION_CACHE_BASE, SYMBOL_INDEX, WARM_BUILD, JAVAC_FAST_PATH, MAVEN_BACKEND, MVND_STORAGE, mvn_dict, mvnd_dict, java_dict
+from utils.resources import jvm_slot
+from utils.javac import javac_compile, to_maven_errors
+from utils.build_meta import BuildMetaCache, module_of, reactor_args, resolve_build_meta, test_compile
+from utils.build_result import BuildResult, run_maven
+from utils.definition_cache import DefinitionCache
+from utils.symbol_index import symbol_index
 
 MVN_SKIPS = [
     '-DfailIfNoTests=false', 
@@ -29,6 +37,17 @@ MVN_SKIPS = [
     '-Dremoteresources.skip',
     '-Dspotbugs.skip=true'
 ]
+# a warm build recompiles only the stale sources, instead of the whole module as the incremental mode of maven-compiler-plugin does
+MVN_WARM = ['-Dmaven.compiler.useIncrementalCompilation=false']
+
+# (commit, module, java, maven) of the last build of each repo root in this process, whose target/ can be reused
+_warm_builds = {}
+# (repo root, commit, module) whose original test cannot be compiled by javac alone, the fast path is not used for them
+_javac_rejected = set()
+# module directories, upstream modules and test classpath, by pom hash
+build_meta = BuildMetaCache(BUILD_META_BASE)
+# the same symbols are resolved by many samples and repair rounds of a project
+definition_cache = DefinitionCache(DEFINITION_CACHE_BASE)
 
 def extract_json(input_str: str):
     """
@@ -116,27 +135,147 @@ def add_imports(repo: UpdateRepo, exp, imports: str):
     with open(testpath, "w", encoding="utf-8") as f:
         f.writelines(lines)
 
-def build_test(exp):
+def mvn_command(java_version: str, maven_version: str, backend=MAVEN_BACKEND) -> list:
+    """
+    The executable of a build with the JDK and Maven of a sample. The "mvnd" backend uses a daemon of the pair,
+    registered in its own storage so that a daemon is never shared by two toolchains. The daemon runs on
+    JAVA_HOME, which must be set in the environment of the build.
+    """
+    mvnd_home = mvnd_dict.get(maven_version) if backend == "mvnd" else None
+    if not mvnd_home:
+        return ['mvn']
+    storage = os.path.join(MVND_STORAGE, f"jdk{java_version}_mvn{maven_version}")
+    # raw streams keep the output of plain mvn, which the build logs are parsed for
+    return [os.path.join(mvnd_home, 'bin', 'mvnd'), f'-Dmvnd.daemonStorage={storage}', '-Dmvnd.rawStreams=true']
+
+def build_env(exp) -> dict:
+    """
+    The environment of a build with the JDK and Maven of the sample. os.environ and the working directory of
+    the process are left untouched, so the builds can run from threads next to the language server.
+    """
+    env = dict(os.environ)
+    env['JAVA_HOME'] = java_dict[exp["tgt_java_version"]]
+    env['MAVEN_HOME'] = mvn_dict[exp["tgt_maven_version"]]
+    env['PATH'] = env['MAVEN_HOME'] + '/bin:' + env['JAVA_HOME'] + '/bin:' + env['PATH']
+    return env
+
+def stop_daemon(mvn: list, env=None) -> None:
+    """
+    Stop the daemons of a mvnd command, a build left running by a killed client would keep writing to target/.
+    """
+    if len(mvn) > 1:
+        subprocess.run(mvn + ['--stop'], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+def warm_build_key(exp, module: str) -> tuple:
+    return (exp["commit_tgt"], module, exp["tgt_java_version"], exp["tgt_maven_version"])
+
+def can_build_warm(repo_root: str, key: tuple) -> bool:
+    """
+    The target/ of `repo_root` can be reused if its last build in this process has the same key.
+    """
+    return _warm_builds.get(repo_root) == key
+
+def record_build(repo_root: str, key: tuple = None) -> None:
+    """
+    Record the key of the last build of `repo_root`, None if target/ is in an unknown state (e.g. a killed build).
+    """
+    if key is None:
+        _warm_builds.pop(repo_root, None)
+    else:
+        _warm_builds[repo_root] = key
+
+def discard_build(repo_root: str, mvn: list, env=None) -> None:
+    """
+    Forget the target/ of a build which did not finish (timeout, abort or cancel): the daemons of mvnd are stopped,
+    as they keep writing to target/ after the client is killed, and the next build of `repo_root` is clean.
+    """
+    stop_daemon(mvn, env)
+    record_build(repo_root)
+
+def rejects_fast_build(error_info: list, test_info: list, test_file: str) -> bool:
+    """
+    A failed warm build or javac compile is trusted if the tests ran or if all the compile errors are located in the
+    substituted test file, otherwise it may come from the outputs of former builds and is retried by a full build.
+    """
+    if test_info:
+        return False
+    located = [line for line in error_info if re.search(r'\.java:\[\d+,\d+\]', line)]
+    if not located:
+        return True
+    return any(test_file not in line for line in located)
+
+def cached_build_meta(exp, repo_root: str, module: str):
+    """
+    The cached build metadata of the module for the JDK and Maven of the sample, None if it is not resolved yet.
+    """
+    if not module:
+        return None
+    return build_meta.get(repo_root, exp["commit_tgt"], module, (exp["tgt_java_version"], exp["tgt_maven_version"]))
+
+def prepare_javac(exp, mvn: list, repo_root: str, module: str, key: tuple, env: dict):
+    """
+    Return the build metadata of the module for the javac fast path, None if it cannot be used.
+    The metadata is resolved once per pom hash (see utils/build_meta.py), and the original test must compile with
+    javac alone. target/ must hold the outputs of this commit, otherwise the clean checkout is compiled again.
+    """
+    cp_key = (repo_root, exp["commit_tgt"], module)
+    if cp_key in _javac_rejected:
+        return None
+    toolchain = (exp["tgt_java_version"], exp["tgt_maven_version"])
+    meta = build_meta.get(repo_root, exp["commit_tgt"], module, toolchain)
+    if meta is not None and can_build_warm(repo_root, key):
+        return meta
+    try:
+        if meta is None:
+            meta = resolve_build_meta(mvn, repo_root, module, env, MVN_SKIPS)
+            if meta is not None:
+                build_meta.put(repo_root, exp["commit_tgt"], module, toolchain, meta)
+        elif test_compile(mvn, repo_root, module, env, MVN_SKIPS, meta=meta).returncode != 0:
+            meta = None
+    except subprocess.TimeoutExpired:
+        logger.info("Test compile timeout.")
+        stop_daemon(mvn, env)
+        meta = None
+    record_build(repo_root, key if meta else None)
+    if meta is None:
+        _javac_rejected.add(cp_key)
+        return None
+    test_file = os.path.join(repo_root, exp['changed_test'].split('#')[0])
+    returncode, output = javac_compile(javac_of(exp), meta["classpath"], meta["test_source_dir"], test_file, env)
+    if returncode != 0:
+        logger.info(f"javac cannot compile the original test, disable the fast path of {cp_key}:\n{output}")
+        _javac_rejected.add(cp_key)
+        return None
+    return meta
+
+def javac_of(exp) -> str:
+    return os.path.join(java_dict[exp["tgt_java_version"]], 'bin', 'javac')
+
+def build_test(exp, repo_base=REPO_BASE, warm=WARM_BUILD, fast_compile=JAVAC_FAST_PATH, cancel=None) -> BuildResult:
 
     logger.info("##" * 5 + " [" + str(exp["test_id"]) + "] " + "##" * 5)
     logger.info(f"Repo Name : {exp['repo_name']}")
     logger.info(f"Commit ID : {exp['commit_tgt']}")
 
     # checkout the repository to this given commit
-    repo_root = os.path.join(REPO_BASE, exp["repo_name"])
+    repo_root = os.path.join(repo_base, exp["repo_name"])
     changed_test = exp['changed_test']
     classname, methodname = changed_test.split('#')
     classname = classname.split('src/test/java/')[-1].replace('.java', '').replace('/', '.')
     test_case = f"{classname}#{methodname}"
 
-    module = changed_test.split('src/test/java/')[0]
-    if module.endswith('/'):
-        module = module[:-1]
+    module = module_of(changed_test)
 
     logger.info(f"Test case: {test_case}")
     logger.info(f"Repo Root Path : {repo_root}")
 
-    repo: UpdateRepo = setup_repo(exp["repo_name"], exp["commit_tgt"], repo_base=REPO_BASE)
+    repo: UpdateRepo = setup_repo(exp["repo_name"], exp["commit_tgt"], repo_base=repo_base)
+
+    env = build_env(exp)
+    key = warm_build_key(exp, module)
+    mvn = mvn_command(exp["tgt_java_version"], exp["tgt_maven_version"])
+    # the classpath is resolved on the clean checkout, before the substitution
+    meta = prepare_javac(exp, mvn, repo_root, module, key, env) if fast_compile else None
 
     #  substitute with prediction
     pred = exp["test_gen"]
@@ -146,43 +285,59 @@ def build_test(exp):
     if imports:
         add_imports(repo, exp, imports)
 
-    os.chdir(repo_root)
-    original_path = os.environ.get('PATH')
-
-    os.environ['JAVA_HOME'] = java_dict[exp["tgt_java_version"]]
-    os.environ['PATH'] = os.environ['JAVA_HOME'] + '/bin:' + os.environ['PATH']
-    os.environ['MAVEN_HOME'] = mvn_dict[exp["tgt_maven_version"]]
-    os.environ['PATH'] = os.environ['MAVEN_HOME'] + '/bin:' + os.environ['PATH']
-
-    cmd =  ['mvn', '-T2C', 'clean', 'test', f'-Dtest={test_case}']
-    if module:
-        cmd.extend(['-pl', f'{module}', '--also-make'])
-    cmd.extend(MVN_SKIPS)
-    print(' '.join(cmd))
-
-    try:
-        # mvn test
-        completed_process = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=300  # 5 min
-        )
-        output = completed_process.stdout.decode()
-        lines = output.splitlines()
-        build_info = [line for line in lines if 'BUILD SUCCESS' in line]
-        test_info = [line for line in lines if 'Tests run' in line]
-        error_info = [line for line in lines if '[ERROR]' in line]
-        logger.info(test_info)
-        logger.info(build_info)
-        logger.info('\n'.join(error_info))
-        # reset
-        os.environ['PATH'] = original_path
-    except subprocess.TimeoutExpired:
-        logger.info("Execute timeout.")
-        raise
+    # compile the test class alone first, most of the candidates fail at compile time
+    if meta:
+        test_file = os.path.join(repo_root, changed_test.split('#')[0])
+        returncode, output = javac_compile(javac_of(exp), meta["classpath"], meta["test_source_dir"], test_file, env)
+        error_info = to_maven_errors(output, module or exp["repo_name"])
+        if returncode != 0 and error_info and not rejects_fast_build(error_info, [], changed_test.split("#")[0]):
+            logger.info('\n'.join(error_info))
+            return BuildResult(returncode, error_info=error_info)
+
+    # the upstream modules of the module are read from the cache instead of being resolved by --also-make
+    reactor = reactor_args(module, meta or cached_build_meta(exp, repo_root, module))
+    # keep target/ between the builds of the same commit, the first build and the rejected warm builds are clean
+    warm = warm and can_build_warm(repo_root, key)
+    for clean in ([False, True] if warm else [True]):
+        cmd = mvn + ['-T2C'] + (['clean'] if clean else []) + ['test', f'-Dtest={test_case}'] + reactor
+        cmd.extend(MVN_SKIPS)
+        if not clean:
+            cmd.extend(MVN_WARM)
+        print(' '.join(cmd))
+
+        try:
+            # mvn test, within the machine-wide budget of Maven builds
+            with jvm_slot("maven"):
+                result = run_maven(
+                    cmd,
+                    cwd=repo_root,
+                    env=env,
+                    timeout=300,  # 5 min
+                    report_dirs=[os.path.join(repo_root, module, 'target/surefire-reports')],
+                    # a candidate which does not compile fails in seconds, instead of at the end of the reactor
+                    abort_on_compile_error=os.path.join(repo_root, module, 'src/test'),
+                    project=module or exp["repo_name"],
+                    cancel=cancel,
+                )
+            logger.info(result.test_info)
+            logger.info(result.build_info)
+            logger.info('\n'.join(result.error_info))
+        except subprocess.TimeoutExpired:
+            logger.info("Execute timeout.")
+            discard_build(repo_root, mvn, env)
+            raise
+        if not result.finished:
+            discard_build(repo_root, mvn, env)
+        else:
+            record_build(repo_root, key)
+        if result.cancelled:
+            logger.info("Build is cancelled.")
+            return result
+        if result.returncode == 0 or clean or not rejects_fast_build(result.error_info, result.test_info, changed_test.split("#")[0]):
+            break
+        logger.info("Warm build is rejected, rebuild from clean.")
 
-    return completed_process.returncode, error_info, test_info
+    return result
 
 def align_code(code):
     code_lines = code.split('\n')
@@ -208,7 +363,10 @@ def write_json(output_file, obj):
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(obj, f, indent=2)
 
-def get_function(name: str, repo_path, proj, repo: UpdateRepo, lsp: SyncLanguageServer):
+def locate_symbol(name: str, proj, repo: UpdateRepo):
+    """
+    The file and position of `name` in the focal method, else in the test method. None if not found.
+    """
     focal_relpath = proj["changed_prod"].split('#')[0]
     focal_file = repo.get_file_tgt(focal_relpath)
     method_start = focal_file.find(proj["prod_code_tgt"])
@@ -228,16 +386,49 @@ def get_function(name: str, repo_path, proj, repo: UpdateRepo, lsp: SyncLanguage
 
     # not found
     if name_idx == -1:
-        return ""
+        return None
     # ***.***
     split_idx = name.find(".")
     if split_idx != -1:
         name_idx += split_idx + 1
-    
+
     ln, cn = TextUtils.get_line_col_from_index(focal_file, method_start + name_idx)
-    definition_loc = lsp.request_definition(focal_relpath, ln, cn)
+    return focal_relpath, ln, cn
+
+def find_definitions(symbols: list, proj, repo: UpdateRepo, lsp: SyncLanguageServer) -> list:
+    """
+    The definition locations of the (name, is_func) `symbols`, None for the names not found in the focal or test method.
+    The names declared once in scope are resolved by the symbol index, the others by one batch of requests to the language server.
+    If the language server does not answer in time, the names of the batch are left unresolved.
+    """
+    locations = [None] * len(symbols)
+    requests, pending = [], []
+    for i, (name, is_func) in enumerate(symbols):
+        position = locate_symbol(name, proj, repo)
+        if position is None:
+            continue
+        symbol = None
+        if SYMBOL_INDEX:
+            index = symbol_index(repo, proj["commit_tgt"])
+            symbol = index.resolve_method(name, position[0]) if is_func else index.resolve_class(name, position[0])
+        if symbol is not None:
+            locations[i] = [symbol.location()]
+        else:
+            requests.append(position)
+            pending.append(i)
+    if requests:
+        try:
+            responses = definition_cache.request_definitions(lsp, proj["commit_tgt"], requests)
+        except MultilspyTimeoutError as e:
+            logger.warning(f"Skip the definitions of {[symbols[i][0] for i in pending]}: {e}")
+            return locations
+        for i, loc in zip(pending, responses):
+            locations[i] = loc
+    return locations
+
+def render_function(name: str, definition_loc, repo: UpdateRepo) -> str:
     res = ""
-    if len(definition_loc) != 0:
+    if definition_loc:
         rel_path = definition_loc[0]["relativePath"]
         file_str = repo.get_file_tgt(definition_loc[0]["relativePath"])
         line = definition_loc[0]["range"]["start"]["line"]
@@ -248,36 +439,9 @@ def get_function(name: str, repo_path, proj, repo: UpdateRepo, lsp: SyncLanguage
             logger.error(f"Error: can not find function {name}")
     return res
 
-def get_class(name: str, repo_path, proj, repo: UpdateRepo, lsp: SyncLanguageServer):
-    focal_relpath = proj["changed_prod"].split('#')[0]
-    focal_file = repo.get_file_tgt(focal_relpath)
-    method_start = focal_file.find(proj["prod_code_tgt"])
-
-    name_idx = -1
-    name_idx_match = re.search(rf'\b{name}\b', proj["prod_code_tgt"])
-    if name_idx_match is not None:
-        name_idx = name_idx_match.start()
-    # find in test file
-    if name_idx == -1:
-        focal_relpath = proj["changed_test"].split('#')[0]
-        focal_file = repo.get_file_tgt(focal_relpath)
-        method_start = focal_file.find(proj["test_code_tgt"])
-        name_idx_match = re.search(rf'\b{name}\b', proj["test_code_tgt"])
-        if name_idx_match is not None:
-            name_idx = name_idx_match.start()
-
-    # not found
-    if name_idx == -1:
-        return ""
-    # ***.***
-    split_idx = name.find(".")
-    if split_idx != -1:
-        name_idx += split_idx + 1
-    
-    ln, cn = TextUtils.get_line_col_from_index(focal_file, method_start + name_idx)
-    loc = lsp.request_definition(focal_relpath, ln, cn)
+def render_class(name: str, loc, repo: UpdateRepo) -> str:
     res = ""
-    if len(loc) != 0:
+    if loc:
         rel_path = loc[0]["relativePath"]
         file_str = repo.get_file_tgt(loc[0]["relativePath"])
         class_info = extract_class_from_line(file_str, loc[0]["range"]["start"]["line"])
@@ -287,6 +451,22 @@ def get_class(name: str, repo_path, proj, repo: UpdateRepo, lsp: SyncLanguageSer
             logger.error(f"Error: can not find class {name}")
     return res
 
+def get_definitions(symbols: list, repo_path, proj, repo: UpdateRepo, lsp: SyncLanguageServer) -> list:
+    """
+    The source of the functions and classes of the (name, is_func) `symbols`, "" for the ones not found.
+    """
+    locations = find_definitions(symbols, proj, repo, lsp)
+    return [
+        render_function(name, loc, repo) if is_func else render_class(name, loc, repo)
+        for (name, is_func), loc in zip(symbols, locations)
+    ]
+
+def get_function(name: str, repo_path, proj, repo: UpdateRepo, lsp: SyncLanguageServer):
+    return get_definitions([(name, True)], repo_path, proj, repo, lsp)[0]
+
+def get_class(name: str, repo_path, proj, repo: UpdateRepo, lsp: SyncLanguageServer):
+    return get_definitions([(name, False)], repo_path, proj, repo, lsp)[0]
+
 def get_varibles(proj, repo: UpdateRepo):
     test_relpath = proj["changed_test"].split('#')[0]
     test_file = repo.get_file_tgt(test_relpath)
@@ -381,19 +561,15 @@ def parse_error(error_info: list[str], repo_path, proj, repo, lsp):
             print(reason)
             error_prompt = f"// <ERROR> {reason}\n{error_line}"
             error_infos.append(error_prompt)
-    info_need = []
     logger.info(symbol_need_names)
+    symbols = []
     for name in symbol_need_names:
         isFunc = False
         if name.find('(') != -1:
             name = name[:name.find('(')]
             isFunc = True
-        if isFunc:
-            func_info = get_function(name, repo_path, proj, repo, lsp)
-            info_need.append(func_info)
-        else:
-            clas_info = get_class(name, repo_path, proj, repo, lsp)
-            info_need.append(clas_info)
+        symbols.append((name, isFunc))
+    info_need = get_definitions(symbols, repo_path, proj, repo, lsp)
     info_need = '\n'.join(info_need)
     error_infos = '\n'.join(error_infos)
     prompt = ""
@@ -403,51 +579,68 @@ def parse_error(error_info: list[str], repo_path, proj, repo, lsp):
             prompt += f"Information you can reference to is:\n{info_need}"
     return prompt
 
-def parse_testfail(error_info, repo_path, proj, repo, lsp):
+def parse_testfail(result: BuildResult, repo_path, proj, repo, lsp):
     test_relpath = proj["changed_test"].split('#')[0]
     test_class = proj["changed_test"].split('#')[0].split('/')[-1].split('.')[0]
+    method_name = proj["changed_test"].split('#')[1]
 
-    # Find report directory: Please refer to {dir} for the individual test results.
-    report_dir = ""
-    for line in error_info:
-        if line.find("Please refer to") != -1 and line.find("test results") != -1:
-            report_dir = line.split()[4]
-            break
-    # Find test class report
-    report_name = ""
-    if report_dir and os.path.exists(report_dir):
-        filenames = [entry.name for entry in os.scandir(report_dir) if entry.is_file() and entry.name.endswith(".txt")]
-        for filename in filenames:
-            if filename.find(test_class) != -1:
-                report_name = filename
-                break
-    report_path = os.path.join(report_dir, report_name)
-    if not os.path.exists(report_path):
+    # Find the failure of the test in the Surefire reports
+    test = result.find_test(test_class, method_name)
+    if test is None or not test.failed:
+        test = next((t for t in result.failed_tests() if t.classname.split('.')[-1] == test_class), None)
+    if test is None or not test.trace:
         return None
-    # Extract info from test report
+    # Extract info from the stack trace, filter out other "at" lines
     filtered_info = []
-    with open(report_path, "r") as f:
-        lines = f.readlines()
-        # Find begin of error info
-        for idx, line in enumerate(lines):
-            if line.find("Error:") != -1:
-                lines = lines[idx:]
-                break
-        # filter out other "at" lines
-        for line in lines:
-            trimmed = line.strip()
-            if trimmed and not (trimmed.startswith("at") and test_class not in line):
-                filtered_info.append(line)
+    for line in test.trace.splitlines():
+        trimmed = line.strip()
+        if trimmed and not (trimmed.startswith("at") and test_class not in line):
+            filtered_info.append(line + "\n")
 
+    with open(os.path.join(repo_path, test_relpath), "r") as f:
+        file_lines = f.readlines()
     for idx, line in enumerate(filtered_info):
         if line.strip().startswith("at"):
             match = re.search(r'.java:(\d+)\)', line)
             if match:
                 ln = int(match.group(1))
-            with open(os.path.join(repo_path, test_relpath), "r") as f:
-                file_lines = f.readlines()
-                error_line = file_lines[ln-1].strip()
-            filtered_info[idx] = error_line + "\n"
+                filtered_info[idx] = file_lines[ln-1].strip() + "\n"
         else:
             filtered_info[idx] = "\\\\" + line
-    return ''.join(filtered_info)
\ No newline at end of file
+    return ''.join(filtered_info)
+
+def collect_definition(info, repo_path, proj, repo, lsp: SyncLanguageServer):
+    if len(info["class"]) > 5:
+        info["class"] = info["class"][:5]
+    # all the definitions are requested at once
+    symbols = [(func, True) for func in info["method"]] + [(clas, False) for clas in info["class"]]
+    res = get_definitions(symbols, repo_path, proj, repo, lsp)
+
+    res = '\n'.join(res)
+    return res
+
+def get_diff_method(src: str, tgt: str) -> str:
+    src_clean = get_code_without_comments(src)
+    src_fmt = formatted_java_code(src_clean)
+    tgt_clean = get_code_without_comments(tgt)
+    tgt_fmt = formatted_java_code(tgt_clean)
+    format_prefix = "@@\n\n"
+    if src_fmt and tgt_fmt:
+        diff_str = get_diff(src_fmt, tgt_fmt)
+    else:
+        diff_str = get_diff(src, tgt)
+    res = diff_str[diff_str.find(format_prefix) + len(format_prefix) :]
+    return res
+
+
+def split_imports_and_test_code(java_code):
+    lines = java_code.strip().split("\n")
+    import_lines = []
+    test_lines = []
+    for idx, line in enumerate(lines):
+        if line.startswith("import ") or line.startswith("import\t"):
+            import_lines.append(line)
+        if line.find("@Test") != -1:
+            test_lines = lines[idx:]
+            break
+    return "\n".join(test_lines), "\n".join(import_lines)
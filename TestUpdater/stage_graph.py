@@ -0,0 +1,584 @@
+"""
+    Stage graph of the test update pipeline:
+        diff -> info -> context -> filter -> generate -> build -> repair -> basic_answer
+    The ablations (pipeline_woIR, pipeline_woCC, naivellm) are variants of the graph. Stage outputs are
+    memoized per sample, so running several variants on one sample only computes the stages which differ.
+    With `candidates` > 1, the generate, repair and basic answer stages sample several candidates, which
+    are built at once in worktrees, and the first passing one wins.
+"""
+import os, copy, json, time, queue, asyncio, threading, traceback, subprocess, contextlib, dataclasses, multiprocessing
+import concurrent.futures
+from typing import Callable
+from utils.multilspy import SyncLanguageServer
+from utils.multilspy.multilspy_config import MultilspyConfig
+from utils.multilspy.multilspy_logger import MultilspyLogger
+from utils.configs import REPO_BASE, DATA_BASE, OUTPUT_BASE, WORKTREE_BASE, LSP_POOL_ADDRESS, LSP_REQUEST_TIMEOUT, LSP_MAX_INFLIGHT
+from utils.configs import MAX_JDTLS, MAX_MAVEN, JVM_HEAP_BUDGET_GB, JDTLS_HEAP_GB, MAVEN_HEAP_GB, SPECULATIVE_CANDIDATES
+from utils.llm import set_rate_share
+from utils.gitter import setup_repo, setup_worktree
+from utils.logger import logger
+from utils.lsp_pool import PooledLanguageServer, kill_server, pool_available
+from utils.progress import ProgressBoard
+from utils.resources import ResourceBudget, set_budget, get_budget, jvm_slot
+from utils.result_sink import ResultSink
+from pipeline_helper import *
+from llm_stages import *
+
+# Java Language Server
+lsp_config = MultilspyConfig.from_dict(
+    {
+        "code_language": "java",
+        "trace_lsp_communication": True,
+        "request_timeout": LSP_REQUEST_TIMEOUT,
+        "max_inflight_requests": LSP_MAX_INFLIGHT,
+    }
+)
+lsp_logger = MultilspyLogger()
+
+FAIL_MESSAGE = '// Fail to generate updated test method.\n'
+
+
+@dataclasses.dataclass
+class Candidate:
+    """
+    A generated test method and the result of building it.
+    """
+    answer: str
+    code: str = ""
+    imports: str = ""
+    compile_result: int = -1
+    error_info: list = dataclasses.field(default_factory=list)
+    test_info: list = dataclasses.field(default_factory=list)
+    # compile errors or test failures rendered for the repair prompt
+    error_prompt: str = None
+
+
+@dataclasses.dataclass(frozen=True)
+class Stage:
+    """
+    A node of the graph: `fn(run, *outputs of deps)` returns the output of the stage.
+    `lsp` marks the stages querying the language server, `diagnostics` the stages reading the build diagnostics.
+    """
+    fn: Callable
+    deps: tuple = ()
+    lsp: bool = False
+    diagnostics: bool = False
+
+
+@dataclasses.dataclass
+class Variant:
+    name: str
+    stages: dict
+
+    def reachable(self, name="basic_answer") -> set:
+        names = {name}
+        for dep in self.stages[name].deps:
+            names |= self.reachable(dep)
+        return names
+
+    @property
+    def needs_lsp(self) -> bool:
+        return any(self.stages[name].lsp for name in self.reachable())
+
+    @property
+    def needs_diagnostics(self) -> bool:
+        return any(self.stages[name].diagnostics for name in self.reachable())
+
+
+class SampleRun:
+    """
+    The stage outputs of one sample, shared by all the variants run on it.
+    """
+
+    def __init__(self, key, value, repo_path, repo_base, lsp, model, diagnostics=True, candidates=1):
+        self.key = key
+        self.value = value
+        self.repo_path = repo_path
+        self.repo_base = repo_base
+        self.lsp = lsp
+        self.model = model
+        # parse the diagnostics of failed builds for the repair stage
+        self.diagnostics = diagnostics
+        # candidates sampled and built at once by the generate, repair and basic answer stages
+        self.candidates = candidates
+        self.test_src = align_code(value['test_code_src'])
+        # the samples of one commit share the checkout
+        self.update_repo = setup_repo(value["repo_name"], value["commit_tgt"], repo_base=repo_base)
+        self.memo = {}
+
+    def memo_key(self, variant: Variant, name: str) -> tuple:
+        stage = variant.stages[name]
+        return (stage.fn.__name__,) + tuple(self.memo_key(variant, dep) for dep in stage.deps)
+
+    def output(self, variant: Variant, name: str):
+        key = self.memo_key(variant, name)
+        if key not in self.memo:
+            stage = variant.stages[name]
+            self.memo[key] = stage.fn(self, *[self.output(variant, dep) for dep in stage.deps])
+        return self.memo[key]
+
+    def candidate(self, answer: str) -> Candidate:
+        code = extract_code(answer)
+        logger.info(code)
+        test_code, imports = split_imports_and_test_code(code)
+        return Candidate(answer, test_code, imports)
+
+    def generate(self, build_prompt, *args) -> list:
+        """
+        The candidates answered to `build_prompt(*args)`, the first one is the answer of the serial pipeline.
+        """
+        if self.candidates == 1:
+            answers = [invoke(self.model, *build_prompt(*args))]
+        else:
+            answers = asyncio.run(asample(self.model, build_prompt, args, self.candidates))
+        return [self.candidate(answer) for answer in answers]
+
+    def diagnose(self, result: BuildResult, repo_path: str, value: dict):
+        # the diagnostics need the substituted test file, parse them before the reset
+        if result.returncode == 0 or not self.diagnostics:
+            return None
+        if result.tests_ran: #test fail
+            return parse_testfail(result, repo_path, value, self.update_repo, self.lsp)
+        return parse_error(result.error_info, repo_path, value, self.update_repo, self.lsp)
+
+    def reset(self, repo_path: str):
+        # the checkout is reused by the next samples of the commit, it must be left clean
+        subprocess.run(['git', 'reset', '--hard', 'HEAD'], cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def built(self, candidate: Candidate, result: BuildResult, error_prompt) -> Candidate:
+        return dataclasses.replace(
+            candidate,
+            compile_result=result.returncode,
+            error_info=result.error_info,
+            test_info=result.test_info,
+            error_prompt=error_prompt,
+        )
+
+    def build(self, candidate: Candidate) -> Candidate:
+        value = dict(self.value, test_gen=candidate.code, imports_gen=candidate.imports)
+        try:
+            result = build_test(value, self.repo_base)
+            error_prompt = self.diagnose(result, self.repo_path, value)
+        finally:
+            self.reset(self.repo_path)
+        return self.built(candidate, result, error_prompt)
+
+    def speculative_bases(self, n: int) -> list:
+        """
+        The repo bases of `n` extra candidates, worktrees at the commit of the sample. They are named after the
+        worker slot (the main checkout or the worktree of a worker), so the later samples and runs reuse them.
+        """
+        slot = "main" if os.path.abspath(self.repo_base) == os.path.abspath(REPO_BASE) else os.path.basename(self.repo_base)
+        bases = []
+        for i in range(1, n + 1):
+            repo_base = os.path.join(WORKTREE_BASE, f"spec_{slot}_{i}")
+            setup_worktree(self.repo_path, os.path.join(repo_base, self.value["repo_name"]), self.value["commit_tgt"])
+            setup_repo(self.value["repo_name"], self.value["commit_tgt"], repo_base=repo_base)
+            bases.append(repo_base)
+        return bases
+
+    def build_first(self, candidates: list) -> Candidate:
+        """
+        Build the candidates at once, the first one in the checkout of the sample and the others in worktrees.
+        Returns the first candidate which passes, the other builds are cancelled. If none passes, returns the first
+        candidate whose tests ran, else the first one. A candidate whose build times out loses, unless all do.
+        """
+        if len(candidates) == 1:
+            return self.build(candidates[0])
+        bases = [self.repo_base] + self.speculative_bases(len(candidates) - 1)
+        values = [dict(self.value, test_gen=c.code, imports_gen=c.imports) for c in candidates]
+        results = [None] * len(candidates)
+        cancel = threading.Event()
+
+        def build_at(i):
+            try:
+                return build_test(values[i], bases[i], cancel=cancel)
+            except subprocess.TimeoutExpired as e:
+                return e
+
+        try:
+            with concurrent.futures.ThreadPoolExecutor(len(candidates)) as pool:
+                futures = {pool.submit(build_at, i): i for i in range(len(candidates))}
+                try:
+                    for future in concurrent.futures.as_completed(futures):
+                        i = futures[future]
+                        results[i] = future.result()
+                        if isinstance(results[i], BuildResult) and results[i].returncode == 0:
+                            logger.info(f"Candidate {i} of {len(candidates)} passes, cancel the other builds.")
+                            break
+                finally:
+                    cancel.set()
+            built = [i for i in range(len(candidates)) if isinstance(results[i], BuildResult) and not results[i].cancelled]
+            if not built:
+                raise results[0]
+            passed = [i for i in built if results[i].returncode == 0]
+            ran = [i for i in built if results[i].tests_ran]
+            best = (passed or ran or built)[0]
+            repo_path = os.path.join(bases[best], self.value["repo_name"])
+            error_prompt = self.diagnose(results[best], repo_path, values[best])
+        finally:
+            for repo_base in bases:
+                self.reset(os.path.join(repo_base, self.value["repo_name"]))
+        return self.built(candidates[best], results[best], error_prompt)
+
+    def finalize(self, variant: Variant):
+        """
+        Run the graph of `variant`, returns the updated copy of the sample (None if no test is generated)
+        and whether it hits an import error.
+        """
+        value = copy.deepcopy(self.value)
+        import_error = False
+        try:
+            if not any(candidate.answer for candidate in self.output(variant, "generate")):
+                value['test_gen'] = FAIL_MESSAGE
+                return None, import_error
+            candidate = self.output(variant, "basic_answer")
+            value['test_gen'] = candidate.code
+            value["imports_gen"] = candidate.imports
+            # get result
+            if candidate.compile_result == 0:
+                value['test_pass'] = True
+                value['build_pass'] = True
+            elif len(candidate.test_info) > 0:
+                value['build_pass'] = True
+            cannot_find_symbol = [line for line in candidate.error_info if 'cannot find symbol' in line]
+            if len(cannot_find_symbol) > 0:
+                import_error = True
+        except Exception as e:
+            traceback.print_exc()
+            value['test_gen'] = FAIL_MESSAGE
+            value['exception_while_gen_tests'] = repr(e)
+        return value, import_error
+
+
+def stage_diff(run: SampleRun):
+    return get_diff_method(run.value['prod_code_src'], run.value['prod_code_tgt'])
+
+def stage_info(run: SampleRun, focal_diff):
+    # ask LLM for info needed, return with method/class names in JSON
+    info_gen_ori = invoke(run.model, *info_prompt(focal_diff, run.test_src))
+    info_gen = json.loads(extract_json(info_gen_ori))
+    logger.info(f"--- info for item {run.key}:{info_gen}")
+    return info_gen_ori, info_gen
+
+def stage_context(run: SampleRun, info):
+    # cllect definitions for method/class
+    definitions = collect_definition(copy.deepcopy(info[1]), run.repo_path, run.value, run.update_repo, run.lsp)
+    # collect references
+    reference = ""
+    variables = get_varibles(run.value, run.update_repo)
+    if variables:
+        reference = "Varibles defined in test class that you can derectly use:\n"
+        reference += f"```java\n{variables}\n```\n"
+    return definitions, reference
+
+def stage_filter(run: SampleRun, focal_diff, info, context):
+    definitions, reference = context
+    filtered_info = invoke(run.model, *filter_prompt(focal_diff, run.test_src, definitions, info[0]))
+    context = filtered_info + "\n" + reference
+    logger.info(context)
+    return context
+
+def stage_no_context(run: SampleRun):
+    return ""
+
+def stage_generate(run: SampleRun, focal_diff, context):
+    return run.generate(generate_prompt, focal_diff, run.test_src, context)
+
+def stage_build(run: SampleRun, candidates: list):
+    return run.build_first(candidates)
+
+def stage_repair(run: SampleRun, focal_diff, context, candidate: Candidate):
+    for i in range(0, 2):
+        if candidate.compile_result == 0:
+            break
+        logger.info(candidate.error_prompt)
+        if not candidate.error_prompt or candidate.error_prompt.strip() == "":
+            break
+        candidate = run.build_first(run.generate(verify_prompt, focal_diff, run.test_src, context, candidate.error_prompt, candidate.answer))
+    return candidate
+
+def stage_basic_answer(run: SampleRun, focal_diff, context, candidate: Candidate):
+    if candidate.compile_result == 0:
+        return candidate
+    return run.build_first(run.generate(basic_prompt, focal_diff, run.test_src, context, candidate.answer))
+
+def stage_skip(run: SampleRun, candidate: Candidate):
+    return candidate
+
+
+PIPELINE_STAGES = {
+    "diff": Stage(stage_diff),
+    "info": Stage(stage_info, ("diff",)),
+    "context": Stage(stage_context, ("info",), lsp=True),
+    "filter": Stage(stage_filter, ("diff", "info", "context")),
+    "generate": Stage(stage_generate, ("diff", "filter")),
+    "build": Stage(stage_build, ("generate",)),
+    "repair": Stage(stage_repair, ("diff", "filter", "build"), lsp=True, diagnostics=True),
+    "basic_answer": Stage(stage_basic_answer, ("diff", "filter", "repair")),
+}
+NO_CONTEXT = {"filter": Stage(stage_no_context)}
+NO_REPAIR = {"repair": Stage(stage_skip, ("build",)), "basic_answer": Stage(stage_skip, ("repair",))}
+
+def make_variant(name: str, *overrides: dict) -> Variant:
+    stages = dict(PIPELINE_STAGES)
+    for override in overrides:
+        stages.update(override)
+    return Variant(name, stages)
+
+VARIANTS = {
+    "pipeline": make_variant("pipeline"),
+    "pipeline_woIR": make_variant("pipeline_woIR", NO_REPAIR),
+    "pipeline_woCC": make_variant("pipeline_woCC", NO_CONTEXT),
+    "naivellm": make_variant("naivellm", NO_CONTEXT, NO_REPAIR),
+}
+
+
+def process_sample(key, value, variants: list, repo_path, repo_base, lsp, model, candidates=SPECULATIVE_CANDIDATES) -> dict:
+    """
+    Run `variants` on one sample, returns {variant name: (value, import_error)}.
+    """
+    logger.info(f"==========> Processing item: {key} <==========")
+    diagnostics = any(variant.needs_diagnostics for variant in variants)
+    run = SampleRun(key, value, repo_path, repo_base, lsp, model, diagnostics, candidates)
+    results = {variant.name: run.finalize(variant) for variant in variants}
+    logger.info(f"{'=============================='*5}")
+    return results
+
+def start_lsp(repo_path: str, items: list):
+    """
+    Return a language server for `repo_path` if a variant of `items` needs it, otherwise None.
+    The server is taken from the language server pool if it is running.
+    """
+    if not any(variant.needs_lsp for _, _, variants in items for variant in variants):
+        return None
+    if pool_available(LSP_POOL_ADDRESS):
+        logger.info(f"Use the language server pool at {LSP_POOL_ADDRESS}")
+        return PooledLanguageServer(LSP_POOL_ADDRESS, repo_path)
+    return SyncLanguageServer.create(lsp_config, lsp_logger, repo_path)
+
+def log_lsp_latencies(lsp) -> None:
+    try:
+        histograms = lsp.latency_histograms()
+    except Exception as e:
+        logger.warning(f"No language server latencies: {e}")
+        return
+    summary = ", ".join(
+        f"{method}: {h['count']} requests, p50 {h['p50']:.3g}s, p99 {h['p99']:.3g}s, max {h['max']:.3g}s, {h['timeouts']} timed out"
+        for method, h in histograms.items()
+    )
+    logger.info(f"Language server latencies of {os.path.basename(lsp.repository_root_path)}: {summary or 'no request'}")
+
+@contextlib.contextmanager
+def serve_lsp(lsp):
+    """
+    Run `lsp` (None for no language server) within the JDTLS budget. On exit only the process of
+    this server is killed if it is still alive, the servers of the other projects keep running.
+    A server of the pool is outside the budget and is kept running for the next runs.
+    """
+    if lsp is None:
+        yield None
+        return
+    if isinstance(lsp, PooledLanguageServer):
+        with lsp.start_server():
+            yield lsp
+            log_lsp_latencies(lsp)
+        return
+    with jvm_slot("jdtls"):
+        process = None
+        try:
+            with lsp.start_server():
+                process = lsp.language_server.server.process
+                yield lsp
+                log_lsp_latencies(lsp)
+        finally:
+            kill_server(process)
+
+def group_by_commit(items: list) -> list:
+    """
+    Group the (key, sample, variants) items by commit_tgt, in the order of the first item of each commit.
+    A group is processed back-to-back with one checkout, one language server index and warm builds.
+    """
+    groups = {}
+    for item in items:
+        groups.setdefault(item[1]["commit_tgt"], []).append(item)
+    return list(groups.values())
+
+def shard_groups(groups: list, workers: int) -> list:
+    """
+    Assign whole commit groups to `workers` shards, the largest group first to the least loaded shard.
+    """
+    shards = [[] for _ in range(workers)]
+    for group in sorted(groups, key=len, reverse=True):
+        min(shards, key=len).extend(group)
+    return shards
+
+def run_worker(worker_id: int, workers: int, items: list, repo_base: str, model, result_queue, rate_share=1.0,
+               candidates=SPECULATIVE_CANDIDATES):
+    """
+    Process the (key, sample, variants) items of one worker with its own worktree, UpdateRepo and language server.
+    Each finished sample is put into `result_queue` as (key, results).
+    """
+    logger.info(f"Worker {worker_id} processes {len(items)} items under {repo_base}")
+    # the workers share the rate limits of the endpoint
+    set_rate_share(rate_share / workers)
+    repo_path = os.path.join(repo_base, items[0][1]['repo_name'])
+    lsp = start_lsp(repo_path, items)
+    with serve_lsp(lsp):
+        for key, value, variants in items:
+            result_queue.put((key, process_sample(key, value, variants, repo_path, repo_base, lsp, model, candidates)))
+    logger.info(f"Worker {worker_id} LLM cache: {llm_cache.stats()}, definition cache: {definition_cache.stats()}")
+
+def run_workers(items: list, repo_path: str, model, workers: int, rate_share=1.0, candidates=SPECULATIVE_CANDIDATES):
+    """
+    Split the commit groups of the items across `workers` processes, each of them owns a git worktree of `repo_path`.
+    Yields (key, results) as soon as a sample is finished, the output order is restored by compaction.
+    """
+    repo_name = items[0][1]['repo_name']
+    shards = shard_groups(group_by_commit(items), workers)
+    result_queue = multiprocessing.Queue()
+    procs = []
+    for worker_id, shard in enumerate(shards):
+        if not shard:
+            continue
+        repo_base = os.path.join(WORKTREE_BASE, f"worker_{worker_id}")
+        setup_worktree(repo_path, os.path.join(repo_base, repo_name), shard[0][1]["commit_tgt"])
+        proc = multiprocessing.Process(target=run_worker, args=(worker_id, workers, shard, repo_base, model, result_queue, rate_share, candidates))
+        proc.start()
+        procs.append(proc)
+
+    remaining = len(items)
+    while remaining > 0:
+        try:
+            key, results = result_queue.get(timeout=60)
+        except queue.Empty:
+            if not any(proc.is_alive() for proc in procs) and result_queue.empty():
+                logger.error(f"All workers exited, {remaining} items are not finished.")
+                break
+            continue
+        remaining -= 1
+        yield key, results
+
+    for proc in procs:
+        proc.join()
+
+def run_project(input_file: str, output_dirs: dict, model, process_continue=True, workers=1, rate_share=1.0, progress=None,
+                candidates=SPECULATIVE_CANDIDATES):
+    """
+    Run the variants {variant name: output dir under OUTPUT_BASE} on the dataset `input_file`.
+    A sample is processed once for all the variants which have not finished it.
+    `rate_share` is the share of the LLM rate limits left to this project, and the progress events
+    of ProgressBoard are put into the `progress` queue if given. `candidates` are sampled and built at once
+    by the generate, repair and basic answer stages.
+    """
+    sample_dict = read_json(os.path.join(DATA_BASE, input_file))
+    repo_name = sample_dict[0]['repo_name']
+    repo_path = os.path.join(REPO_BASE, repo_name)
+    test_ids = [value['test_id'] for value in sample_dict]
+
+    sinks = {
+        name: ResultSink(os.path.join(OUTPUT_BASE, output_dir, input_file), resume=process_continue)
+        for name, output_dir in output_dirs.items()
+    }
+    items = []
+    for key, value in enumerate(sample_dict):
+        variants = [VARIANTS[name] for name, sink in sinks.items() if not sink.is_done(value['test_id'])]
+        if variants:
+            items.append((key, value, variants))
+    stats = {name: {"test_pass": [], "build_pass": [], "import_error": []} for name in sinks}
+    if progress is not None:
+        progress.put(("start", input_file, len(items)))
+
+    def collect(key, results):
+        if progress is not None:
+            progress.put(("done", input_file))
+        for name, (value, import_error) in results.items():
+            if value is None:
+                sinks[name].skip(sample_dict[key]['test_id'])
+                continue
+            if value.get('test_pass'):
+                stats[name]["test_pass"].append(key)
+            if value.get('build_pass'):
+                stats[name]["build_pass"].append(key)
+            if import_error:
+                stats[name]["import_error"].append(key)
+            sinks[name].append(value)
+
+    try:
+        if not items:
+            pass
+        elif workers > 1:
+            logger.info(f"Processing {len(items)} items of {repo_name} with {workers} workers...")
+            for key, results in run_workers(items, repo_path, model, workers, rate_share, candidates):
+                collect(key, results)
+        else:
+            set_rate_share(rate_share)
+            # initialize
+            lsp = start_lsp(repo_path, items)
+            if lsp:
+                logger.info(f"Initializing Language Server for {repo_name}...")
+            with serve_lsp(lsp):
+                # the samples of one commit run back-to-back, the outputs are reordered by compaction
+                for key, value, variants in [item for group in group_by_commit(items) for item in group]:
+                    collect(key, process_sample(key, value, variants, repo_path, REPO_BASE, lsp, model, candidates))
+    finally:
+        # write the JSON outputs in the order of the dataset
+        for sink in sinks.values():
+            sink.compact(test_ids)
+            sink.close()
+        if progress is not None:
+            progress.put(("end", input_file))
+    if not items:
+        return
+
+    for name, stat in stats.items():
+        logger.info(f"[{name}] {input_file}")
+        logger.info(f"===============TEST PASS : {len(stat['test_pass'])}=====================\n{sorted(stat['test_pass'])}==")
+        logger.info(f"===============BUILD PASS : {len(stat['build_pass'])}=====================\n{sorted(stat['build_pass'])}==")
+        logger.info(f"===============IMPORT ERROR : {len(stat['import_error'])}=====================\n=={sorted(stat['import_error'])}==")
+    logger.info(f"LLM cache: {llm_cache.stats()}, definition cache: {definition_cache.stats()}")
+
+def run_projects(projects: list, model, jobs: int, workers=1, process_continue=True, progress_interval=60,
+                 candidates=SPECULATIVE_CANDIDATES):
+    """
+    Run the (input_file, output_dirs) projects with up to `jobs` of them at once, each in its own process.
+    The language servers, Maven builds and their heap are limited machine-wide by a ResourceBudget,
+    and the progress and ETA of every project is logged every `progress_interval` seconds.
+    """
+    set_budget(ResourceBudget(MAX_JDTLS, MAX_MAVEN, JVM_HEAP_BUDGET_GB, JDTLS_HEAP_GB, MAVEN_HEAP_GB))
+    board = ProgressBoard([input_file for input_file, _ in projects])
+    progress = multiprocessing.Queue()
+    pending = list(projects)
+    running = {}
+    last_log = time.monotonic()
+
+    while pending or running:
+        while pending and len(running) < jobs:
+            input_file, output_dirs = pending.pop(0)
+            # the running projects split the rate limits of the endpoint
+            proc = multiprocessing.Process(
+                target=run_project,
+                args=(input_file, output_dirs, model, process_continue, workers, 1 / jobs, progress, candidates),
+            )
+            proc.start()
+            running[input_file] = proc
+        try:
+            board.update(progress.get(timeout=5))
+        except queue.Empty:
+            pass
+        for input_file, proc in list(running.items()):
+            if not proc.is_alive():
+                proc.join()
+                if proc.exitcode != 0:
+                    logger.error(f"Project {input_file} exited with code {proc.exitcode}")
+                board.update(("end", input_file))
+                del running[input_file]
+                board.log(get_budget().usage())
+        if time.monotonic() - last_log > progress_interval:
+            board.log(get_budget().usage())
+            last_log = time.monotonic()
+
+    # drain the events left by the last projects
+    while not progress.empty():
+        board.update(progress.get())
+    board.log(get_budget().usage())
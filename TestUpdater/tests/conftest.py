@@ -0,0 +1,4 @@
+import os, sys
+
+# the pipeline imports its modules relative to TestUpdater/, e.g. `from utils.configs import ...`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,32 @@
+from utils.build_meta import module_of, output_dirs, reactor_args, repo_key
+
+
+def test_module_of():
+    assert module_of("core/src/test/java/com/foo/FooTest.java#test") == "core"
+    assert module_of("src/test/java/com/foo/FooTest.java#test") == ""
+
+
+def test_repo_key():
+    assert repo_key("/repos/prebid/prebid-server-java") == "prebid/prebid-server-java"
+    assert repo_key("/worktrees/worker_1/prebid/prebid-server-java/") == "prebid/prebid-server-java"
+    assert repo_key("/repos/other/prebid-server-java") != repo_key("/repos/prebid/prebid-server-java")
+
+
+def test_reactor_args():
+    assert reactor_args("") == []
+    assert reactor_args("web") == ["-pl", "web", "--also-make"]
+    assert reactor_args("web", {"upstream": ["core", "api"]}) == ["-pl", "core,api,web"]
+    # a module without upstream modules in the reactor is built alone
+    assert reactor_args("core", {"upstream": []}) == ["-pl", "core"]
+
+
+def test_output_dirs(tmp_path):
+    (tmp_path / "web").mkdir()
+    (tmp_path / "web" / "pom.xml").write_text(
+        '<project xmlns="http://maven.apache.org/POM/4.0.0"><build>'
+        "<outputDirectory>${project.build.directory}/main</outputDirectory>"
+        "<testOutputDirectory>${custom.dir}/test</testOutputDirectory>"
+        "</build></project>"
+    )
+    dirs = output_dirs(str(tmp_path), "web")
+    assert dirs == {"classes": str(tmp_path / "web" / "target/main"), "test-classes": str(tmp_path / "web" / "target/test-classes")}
@@ -0,0 +1,71 @@
+from utils.build_result import BuildResult, CompileErrorWatch, parse_surefire_report
+
+MAIN_BLOCK = [
+    "[ERROR] COMPILATION ERROR : ",
+    "[INFO] -------------------------------------------------------------",
+    "[ERROR] /repo/src/main/java/Foo.java:[3,5] cannot find symbol",
+    "[INFO] 1 error",
+]
+TEST_BLOCK = [
+    "[ERROR] COMPILATION ERROR : ",
+    "[INFO] -------------------------------------------------------------",
+    "[ERROR] /repo/src/test/java/FooTest.java:[12,9] cannot find symbol",
+    "  symbol:   method bar()",
+    "  location: class FooTest",
+    "[ERROR] /repo/src/test/java/FooTest.java:[20,1] class, interface, or enum expected",
+    "[INFO] 2 errors ",
+]
+
+
+def test_compile_error_watch_matches_test_block():
+    watch = CompileErrorWatch("/repo/src/test/java/")
+    assert not any(watch.feed(line) for line in MAIN_BLOCK)
+    assert [watch.feed(line) for line in TEST_BLOCK][-1]
+    assert watch.block == [
+        "[ERROR] /repo/src/test/java/FooTest.java:[12,9] cannot find symbol",
+        "[ERROR]   symbol:   method bar()",
+        "[ERROR]   location: class FooTest",
+        "[ERROR] /repo/src/test/java/FooTest.java:[20,1] class, interface, or enum expected",
+    ]
+
+
+def test_compile_error_watch_needs_complete_block():
+    watch = CompileErrorWatch("/repo/src/test/java")
+    assert not any(watch.feed(line) for line in TEST_BLOCK[:-1])
+    # a sibling directory sharing the prefix is not the source directory
+    watch = CompileErrorWatch("/repo/src/test/ja")
+    assert not any(watch.feed(line) for line in TEST_BLOCK)
+
+
+def test_parse_surefire_report(tmp_path):
+    report = tmp_path / "TEST-FooTest.xml"
+    report.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<testsuite name="com.foo.FooTest" tests="4">\n'
+        '  <testcase name="passes" classname="com.foo.FooTest" time="1,234.5"/>\n'
+        '  <testcase name="fails" classname="com.foo.FooTest" time="0.1">\n'
+        '    <failure message="expected: &lt;1&gt; but was: &lt;2&gt;" type="org.opentest4j.AssertionFailedError">'
+        "org.opentest4j.AssertionFailedError: expected: &lt;1&gt; but was: &lt;2&gt;\n"
+        "\tat org.junit.Assert.fail(Assert.java:89)\n"
+        "\tat com.foo.FooTest.fails(FooTest.java:12)\n"
+        "</failure>\n"
+        "  </testcase>\n"
+        '  <testcase name="errors" classname="com.foo.FooTest"><error type="java.lang.NullPointerException"/></testcase>\n'
+        '  <testcase name="skipped" classname="com.foo.FooTest" time="x"><skipped/></testcase>\n'
+        "</testsuite>\n"
+    )
+    passes, fails, errors, skipped = parse_surefire_report(str(report))
+    assert (passes.status, passes.time, passes.failed) == ("passed", 1234.5, False)
+    assert fails.status == "failure" and fails.failed
+    assert fails.message == "expected: <1> but was: <2>"
+    assert fails.type == "org.opentest4j.AssertionFailedError"
+    assert fails.trace.startswith("org.opentest4j.AssertionFailedError: ")
+    assert fails.stack == ["at org.junit.Assert.fail(Assert.java:89)", "at com.foo.FooTest.fails(FooTest.java:12)"]
+    assert (errors.status, errors.type, errors.message, errors.failed) == ("error", "java.lang.NullPointerException", "", True)
+    assert (skipped.status, skipped.time, skipped.failed) == ("skipped", 0.0, False)
+
+
+def test_finished():
+    assert BuildResult(returncode=1).finished
+    assert not BuildResult(returncode=1, aborted=True).finished
+    assert not BuildResult(returncode=1, cancelled=True).finished
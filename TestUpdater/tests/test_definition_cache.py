@@ -0,0 +1,65 @@
+import os
+from utils.definition_cache import DefinitionCache, content_hash
+
+
+def location(repo_root, path):
+    return {
+        "uri": "file://" + os.path.join(repo_root, path),
+        "absolutePath": os.path.join(repo_root, path),
+        "relativePath": path,
+        "range": {"start": {"line": 1, "character": 0}, "end": {"line": 1, "character": 3}},
+    }
+
+
+class FakeLsp:
+    def __init__(self, repo_root, answers):
+        self.repository_root_path = repo_root
+        self.answers = answers
+        self.requests = []
+
+    def request_definitions(self, requests):
+        self.requests.extend(requests)
+        return [self.answers[request] for request in requests]
+
+
+def test_locations_relative_to_the_repo(tmp_path):
+    cache = DefinitionCache(str(tmp_path / "cache"))
+    first = str(tmp_path / "repos" / "org" / "repo")
+    worktree = str(tmp_path / "worktrees" / "1" / "org" / "repo")
+    cache.put(first, "key", [location(first, "src/Foo.java")])
+    # the worktrees of a repo share its entries
+    assert cache.get(worktree, "key") == [location(worktree, "src/Foo.java")]
+    # a repo of the same name in another org does not
+    assert cache.get(str(tmp_path / "repos" / "other" / "repo"), "key") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "bypass": False}
+
+
+def test_request_definitions(tmp_path):
+    repo_root = str(tmp_path / "org" / "repo")
+    os.makedirs(repo_root)
+    with open(os.path.join(repo_root, "FooTest.java"), "w") as f:
+        f.write("class FooTest {}")
+    found = ("FooTest.java", 1, 2)
+    indexing = ("FooTest.java", 3, 4)
+    lsp = FakeLsp(repo_root, {found: [location(repo_root, "Foo.java")], indexing: []})
+    cache = DefinitionCache(str(tmp_path / "cache"))
+
+    assert cache.request_definitions(lsp, "c1", [found, indexing]) == [[location(repo_root, "Foo.java")], []]
+    # the empty result is asked again
+    assert cache.request_definitions(lsp, "c1", [found, indexing]) == [[location(repo_root, "Foo.java")], []]
+    assert lsp.requests == [found, indexing, indexing]
+
+    # a change of the queried file or of the commit misses the cache
+    lsp.requests = []
+    cache.request_definition(lsp, "c2", *found)
+    with open(os.path.join(repo_root, "FooTest.java"), "a") as f:
+        f.write("\n")
+    cache.request_definition(lsp, "c1", *found)
+    assert lsp.requests == [found, found]
+
+
+def test_content_hash(tmp_path):
+    path = tmp_path / "Foo.java"
+    assert content_hash(str(path)) == ""
+    path.write_text("class Foo {}")
+    assert content_hash(str(path)) != ""
@@ -0,0 +1,38 @@
+from utils.javac import to_maven_errors
+
+JAVAC_OUTPUT = """\
+/repo/src/test/java/FooTest.java:12: error: cannot find symbol
+        bar();
+        ^
+  symbol:   method bar()
+  location: class FooTest
+/repo/src/test/java/FooTest.java:15: warning: [deprecation] baz() in Foo has been deprecated
+        foo.baz();
+           ^
+/repo/src/test/java/FooTest.java:20: error: ';' expected
+    int x = 1
+             ^
+Note: Some input files use unchecked or unsafe operations.
+2 errors
+1 warning
+"""
+
+
+def test_to_maven_errors():
+    errors = [
+        "[ERROR] /repo/src/test/java/FooTest.java:[12,9] cannot find symbol",
+        "[ERROR]   symbol:   method bar()",
+        "[ERROR]   location: class FooTest",
+        "[ERROR] /repo/src/test/java/FooTest.java:[20,14] ';' expected",
+    ]
+    lines = to_maven_errors(JAVAC_OUTPUT, "foo")
+    assert lines[0] == "[ERROR] COMPILATION ERROR : "
+    assert lines[1:5] == errors
+    assert "on project foo: Compilation failure" in lines[5]
+    assert lines[6:10] == errors
+    assert lines[-1] == "[ERROR] -> [Help 1]"
+
+
+def test_to_maven_errors_without_errors():
+    assert to_maven_errors("", "foo") == []
+    assert to_maven_errors("Note: Some input files use unchecked or unsafe operations.\n", "foo") == []
@@ -0,0 +1,79 @@
+import sqlite3, types
+import pytest
+from utils import llm_cache
+from utils.llm_cache import LLMCache
+
+
+def message(type_, content):
+    return types.SimpleNamespace(type=type_, content=content)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # a strictly increasing last_access, the entries are evicted in the order they are used
+    now = [1000.0]
+
+    def time():
+        now[0] += 1
+        return now[0]
+
+    monkeypatch.setattr(llm_cache, "time", types.SimpleNamespace(time=time))
+
+
+def test_make_key():
+    model = types.SimpleNamespace(model_name="gpt", temperature=0.0)
+    messages = [message("system", "s"), message("human", "h")]
+    key = LLMCache.make_key(model, messages)
+    assert key == LLMCache.make_key(model, list(messages))
+    assert key == LLMCache.make_key(model, messages, sample=0)
+    assert key != LLMCache.make_key(model, messages, sample=1)
+    # the temperature a sample is drawn at, not the one of the unbound model
+    assert key == LLMCache.make_key(model, messages, temperature=0.0)
+    assert LLMCache.make_key(model, messages, 1, 0.8) != LLMCache.make_key(model, messages, 1, 0.9)
+    assert LLMCache.make_key(model, messages, 1, 0.8) == LLMCache.make_key(
+        types.SimpleNamespace(model_name="gpt", temperature=0.8), messages, 1)
+    assert key != LLMCache.make_key(types.SimpleNamespace(model_name="gpt", temperature=0.7), messages)
+    assert key != LLMCache.make_key(types.SimpleNamespace(model_name="other", temperature=0.0), messages)
+    assert key != LLMCache.make_key(model, [message("human", "s"), message("human", "h")])
+
+
+def test_get_put(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite"))
+    assert cache.get("k") is None
+    cache.put("k", "response")
+    cache.put("k", "updated")
+    assert cache.get("k") == "updated"
+    assert cache.stats() == {"hits": 1, "misses": 1, "bypass": False}
+    assert cache.total_size(cache._connect()) == len("updated")
+
+    bypass = LLMCache(str(tmp_path / "llm.sqlite"), bypass=True)
+    bypass.put("other", "response")
+    assert bypass.get("k") is None
+    assert cache.get("other") is None
+
+
+def test_evict_least_recently_used(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), max_bytes=30)
+    for key in "abc":
+        cache.put(key, "x" * 10)
+    assert cache.get("a") == "x" * 10
+    cache.put("d", "x" * 10)
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["x" * 10] * 3
+    conn = cache._connect()
+    assert cache.total_size(conn) == conn.execute("SELECT SUM(size) FROM responses").fetchone()[0] == 30
+
+
+def test_total_size_shared_and_initialized(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    # a database written before the size was kept in the meta table
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, response TEXT, size INTEGER, last_access REAL)")
+    conn.execute("INSERT INTO responses VALUES ('old', 'xxxx', 4, 0)")
+    conn.commit()
+    conn.close()
+    first, second = LLMCache(path), LLMCache(path)
+    first.put("new", "yy")
+    assert second.total_size(second._connect()) == 6
+    second.put("old", "x")
+    assert first.total_size(first._connect()) == 3
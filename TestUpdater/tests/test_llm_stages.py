@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+
+pytest.importorskip("langchain_openai")
+import llm_stages
+from utils import llm
+
+
+@pytest.fixture
+def fake_ainvoke(monkeypatch):
+    calls = []
+
+    async def ainvoke(model, prompt, query, sample=0):
+        calls.append(query)
+        # the later inputs are answered first
+        await asyncio.sleep(0.01 * (5 - len(calls)))
+        return f"answer {query}"
+
+    monkeypatch.setattr(llm_stages, "ainvoke", ainvoke)
+    return calls
+
+
+def test_abatch_keeps_the_order(fake_ainvoke):
+    args_list = [(f"diff{i}", f"src{i}", f"ctx{i}") for i in range(4)]
+    answers = asyncio.run(llm_stages.abatch(None, llm_stages.generate_prompt, args_list))
+    queries = [llm_stages.generate_prompt(*args)[1] for args in args_list]
+    assert answers == [f"answer {query}" for query in queries]
+
+
+def test_stage_functions(fake_ainvoke):
+    assert asyncio.run(llm_stages.agen_info(None, "diff", "src")) == f"answer {llm_stages.info_prompt('diff', 'src')[1]}"
+    asyncio.run(llm_stages.agen_filter(None, "diff", "src", "ctx", "answer"))
+    asyncio.run(llm_stages.agen_test(None, "diff", "src", "ctx"))
+    asyncio.run(llm_stages.averify_code(None, "diff", "src", "ctx", "error", "answer"))
+    asyncio.run(llm_stages.abasic_answer(None, "diff", "src", "ctx", "answer"))
+    assert [query.get("ERRORINFO") for query in fake_ainvoke] == [None, None, None, "error", None]
+
+
+def test_limits_share_the_model_map_keys():
+    assert set(llm.inflight_limits) == set(llm.rate_limits) == set(llm.model_map)
+    llm.set_rate_share(1.0)
+    for name, model in llm.model_map.items():
+        assert llm.model_key(model) == name
+        limiter = llm.get_rate_limiter(model)
+        assert limiter.name == name
+        assert limiter.max_inflight == llm.inflight_limits[name]
@@ -0,0 +1,92 @@
+import json, asyncio
+from utils.multilspy.lsp_protocol_handler.server import FrameParser, LanguageServerHandler, ProcessLaunchInfo
+
+
+def frame(payload, headers: bytes = b"") -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    return headers + b"Content-Length: %d\r\n\r\n" % len(body) + body
+
+
+def test_several_messages_in_one_chunk():
+    data = frame({"id": 1}) + frame({"id": 2}) + frame({"method": "x"})
+    assert [json.loads(body) for body in FrameParser().feed(data)] == [{"id": 1}, {"id": 2}, {"method": "x"}]
+
+
+def test_message_split_in_single_bytes():
+    parser = FrameParser()
+    data = frame({"id": 1, "result": "é" * 10}) + frame({"id": 2})
+    bodies = []
+    for i in range(len(data)):
+        bodies.extend(parser.feed(data[i : i + 1]))
+    # the length counts the bytes, not the characters
+    assert [json.loads(body) for body in bodies] == [{"id": 1, "result": "é" * 10}, {"id": 2}]
+    assert parser.buffer == b""
+
+
+def test_incomplete_body_is_kept():
+    parser = FrameParser()
+    data = frame({"id": 1})
+    assert parser.feed(data[:-3]) == []
+    assert parser.feed(data[-3:]) == [data[data.index(b"{"):]]
+
+
+def test_other_headers_are_ignored():
+    data = frame({"id": 1}, headers=b"Content-Type: application/vscode-jsonrpc; charset=utf-8\r\n")
+    assert [json.loads(body) for body in FrameParser().feed(data)] == [{"id": 1}]
+
+
+def test_header_without_length_is_skipped():
+    data = b"Content-Type: text\r\n\r\n" + b"Content-Length: x\r\n\r\n" + frame({"id": 1})
+    assert [json.loads(body) for body in FrameParser().feed(data)] == [{"id": 1}]
+
+
+class FakeStdin:
+    """
+    Answers each request written by the client with the frames of `replies(request)`.
+    """
+
+    def __init__(self, stdout: asyncio.StreamReader, replies):
+        self.stdout = stdout
+        self.replies = replies
+
+    def write(self, data: bytes) -> None:
+        request = json.loads(data[data.index(b"{"):])
+        for reply in self.replies(request):
+            self.stdout.feed_data(frame(reply))
+
+    def writelines(self, lines) -> None:
+        self.write(b"".join(lines))
+
+    async def drain(self) -> None:
+        pass
+
+
+def test_notification_before_response_is_handled_first():
+    seen = []
+
+    def replies(request):
+        return [
+            {"jsonrpc": "2.0", "method": "language/status", "params": {"type": "ServiceReady"}},
+            {"jsonrpc": "2.0", "id": request["id"], "result": list(seen)},
+        ]
+
+    async def main():
+        handler = LanguageServerHandler(ProcessLaunchInfo(cmd="true"))
+
+        async def on_status(params):
+            # a handler giving control back to the event loop
+            await asyncio.sleep(0.01)
+            seen.append(params["type"])
+
+        handler.on_notification("language/status", on_status)
+        stdout = asyncio.StreamReader()
+        handler.process = type("Process", (), {"stdout": stdout, "stdin": FakeStdin(stdout, replies), "stderr": None})()
+        handler.loop = asyncio.get_event_loop()
+        handler._create_task(handler.run_forever())
+        try:
+            await handler.send_request("workspace/symbol", {})
+            return seen
+        finally:
+            stdout.feed_eof()
+
+    assert asyncio.run(main()) == ["ServiceReady"]
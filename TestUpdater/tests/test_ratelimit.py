@@ -0,0 +1,56 @@
+import types
+import pytest
+from utils.ratelimit import TokenBucket, RateLimiter, retry_after, DEFAULT_RETRY_AFTER
+
+
+def test_token_bucket_refill():
+    bucket = TokenBucket(60, period=60.0)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0.0
+    bucket.consume(60)
+    # one token per second
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1) == pytest.approx(0.0)
+    # the level is capped at the capacity
+    assert bucket.wait_time(60, now + 1000) == 0.0
+    assert bucket.level == 60
+
+
+def test_token_bucket_debt_and_large_request():
+    bucket = TokenBucket(10, period=10.0)
+    now = bucket.updated
+    # a request larger than the bucket only waits for a full bucket, and leaves a debt
+    assert bucket.wait_time(100, now) == 0.0
+    bucket.consume(100)
+    assert bucket.wait_time(1, now) == pytest.approx(91.0)
+
+
+def test_rate_limiter_inflight_cap():
+    limiter = RateLimiter("model", max_inflight=2)
+    assert limiter._reserve(10) == 0.0
+    assert limiter._reserve(10) == 0.0
+    assert limiter._reserve(10) > 0.0
+    limiter.release()
+    assert limiter._reserve(10) == 0.0
+    assert limiter.inflight == 2
+
+
+def test_rate_limiter_rpm_and_block():
+    limiter = RateLimiter("model", rpm=1)
+    assert limiter._reserve(1) == 0.0
+    assert limiter._reserve(1) == pytest.approx(60.0, rel=0.01)
+    limiter = RateLimiter("model")
+    limiter.block(30)
+    assert limiter._reserve(1) == pytest.approx(30.0, rel=0.01)
+    assert limiter.inflight == 0
+
+
+def test_retry_after():
+    def error(status_code, headers):
+        return types.SimpleNamespace(status_code=status_code, response=types.SimpleNamespace(headers=headers))
+
+    assert retry_after(ValueError()) is None
+    assert retry_after(error(500, {"retry-after": "3"})) is None
+    assert retry_after(error(429, {"retry-after": "3"})) == 3.0
+    assert retry_after(error(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(error(429, {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == DEFAULT_RETRY_AFTER
@@ -0,0 +1,37 @@
+import os, time, signal, multiprocessing
+from utils.resources import ResourceBudget
+
+
+def hold(budget, kind, ready):
+    budget.acquire(kind)
+    ready.set()
+    time.sleep(60)
+
+
+def test_heap_budget():
+    budget = ResourceBudget(max_jdtls=2, max_maven=2, heap_gb=9, jdtls_heap_gb=4, maven_heap_gb=2)
+    assert budget._available("jdtls")
+    budget.acquire("jdtls")
+    # a second server would leave no room for a build
+    assert not budget._available("jdtls")
+    budget.acquire("maven")
+    budget.acquire("maven")
+    assert not budget._available("maven")
+    assert budget.usage() == "jdtls 1/2, maven 2/2, heap 8/9GB"
+    budget.release("maven")
+    assert budget.usage() == "jdtls 1/2, maven 1/2, heap 6/9GB"
+
+
+def test_slots_of_dead_process_are_reclaimed():
+    budget = ResourceBudget(max_jdtls=1, max_maven=1, heap_gb=100, jdtls_heap_gb=4, maven_heap_gb=2)
+    ready = multiprocessing.Event()
+    holder = multiprocessing.Process(target=hold, args=(budget, "maven", ready))
+    holder.start()
+    assert ready.wait(30)
+    assert not budget._available("maven")
+    os.kill(holder.pid, signal.SIGKILL)
+    # killed but not reaped yet
+    time.sleep(0.2)
+    assert budget.acquire("maven") < 5
+    holder.join()
+    assert budget.usage() == "jdtls 0/1, maven 1/1, heap 2/100GB"
@@ -0,0 +1,52 @@
+import json
+from utils.result_sink import ResultSink
+
+
+def test_resume_from_checkpoint(tmp_path):
+    output = str(tmp_path / "out" / "result.json")
+    sink = ResultSink(output)
+    sink.append({"test_id": 1, "code": "a"})
+    sink.skip(2)
+    sink.close()
+
+    sink = ResultSink(output)
+    assert sink.is_done(1) and sink.is_done(2) and not sink.is_done(3)
+    sink.close()
+
+    sink = ResultSink(output, resume=False)
+    assert not sink.is_done(1)
+    sink.close()
+
+
+def test_torn_line_is_dropped(tmp_path):
+    output = str(tmp_path / "result.json")
+    with open(tmp_path / "result.jsonl", "w") as f:
+        f.write(json.dumps({"test_id": 1}) + "\n" + '{"test_id": 2, "co')
+    sink = ResultSink(output)
+    assert sink.done == {1}
+    sink.append({"test_id": 3})
+    sink.close()
+    assert set(ResultSink(output).read()) == {1, 3}
+
+
+def test_compact_in_dataset_order(tmp_path):
+    output = str(tmp_path / "result.json")
+    sink = ResultSink(output)
+    sink.append({"test_id": 2, "code": "old"})
+    sink.append({"test_id": 1, "code": "a"})
+    sink.skip(3)
+    # the later line wins
+    sink.append({"test_id": 2, "code": "b"})
+    outputs = sink.compact([1, 2, 3, 4])
+    sink.close()
+    assert outputs == [{"test_id": 1, "code": "a"}, {"test_id": 2, "code": "b"}]
+    with open(output) as f:
+        assert json.load(f) == outputs
+
+
+def test_seed_from_json_output(tmp_path):
+    output = tmp_path / "result.json"
+    output.write_text(json.dumps([{"test_id": 1}, {"test_id": 2}]))
+    sink = ResultSink(str(output))
+    assert sink.done == {1, 2}
+    sink.close()
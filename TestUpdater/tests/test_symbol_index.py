@@ -0,0 +1,116 @@
+import pytest
+from git import Repo
+from utils import symbol_index
+from utils.symbol_index import SymbolIndex
+
+FILES = {
+    "src/main/java/com/foo/Foo.java": """
+package com.foo;
+
+public class Foo {
+    private int count;
+
+    public Foo() {}
+
+    public int make(int x) { return helper(x); }
+
+    private int helper(int x) { return x; }
+
+    public static class Inner {
+        public void run() {}
+    }
+}
+""",
+    "src/main/java/com/foo/util/Strings.java": """
+package com.foo.util;
+
+public final class Strings {
+    public static String twice(String s) { return s + s; }
+    public static String make(String s) { return s; }
+}
+""",
+    "src/main/java/com/bar/Foo.java": """
+package com.bar;
+
+public class Foo {
+    public int make(int x) { return x; }
+}
+""",
+    "src/test/java/com/foo/FooTest.java": """
+package com.foo;
+
+import static com.foo.util.Strings.twice;
+import com.foo.util.Strings;
+import java.util.List;
+
+public class FooTest {
+    void test(List<String> list) {
+        Foo foo = new Foo();
+        list.add(twice("a"));
+        Strings.make("b");
+        check();
+    }
+
+    void check() {}
+}
+""",
+}
+TEST = "src/test/java/com/foo/FooTest.java"
+
+
+def make_repo(root):
+    repo = Repo.init(root)
+    for path, code in FILES.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(code)
+    repo.index.add(list(FILES))
+    return repo, repo.index.commit("init").hexsha
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    return SymbolIndex(*make_repo(tmp_path_factory.mktemp("repo")))
+
+
+def test_symbols(index):
+    assert set(index.files) == set(FILES)
+    assert {s.qualified_name for s in index.symbols["Foo"]} == {"com.foo.Foo", "com.bar.Foo", "com.foo.Foo#Foo"}
+    count = index.symbols["count"][0]
+    assert (count.kind, count.owner, count.signature) == ("field", "com.foo.Foo", "private int count")
+    run = index.symbols["run"][0]
+    assert (run.qualified_name, run.path, run.start_line) == ("com.foo.Foo.Inner#run", "src/main/java/com/foo/Foo.java", 13)
+
+
+def test_resolve_class(index):
+    # same package wins over the Foo of another package
+    assert index.resolve_class("Foo", TEST).qualified_name == "com.foo.Foo"
+    assert index.resolve_class("Foo", "src/main/java/com/bar/Foo.java").qualified_name == "com.bar.Foo"
+    assert index.resolve_class("Strings", TEST).qualified_name == "com.foo.util.Strings"
+    assert index.resolve_class("Foo.Inner", TEST).qualified_name == "com.foo.Foo.Inner"
+    # library classes are left to the language server
+    assert index.resolve_class("List", TEST) is None
+
+
+def test_resolve_method(index):
+    assert index.resolve_method("check", TEST).qualified_name == "com.foo.FooTest#check"
+    assert index.resolve_method("this.check", TEST).qualified_name == "com.foo.FooTest#check"
+    assert index.resolve_method("twice", TEST).qualified_name == "com.foo.util.Strings#twice"
+    assert index.resolve_method("Strings.make", TEST).qualified_name == "com.foo.util.Strings#make"
+    assert index.resolve_method("Foo.make", TEST).qualified_name == "com.foo.Foo#make"
+    assert index.resolve_method("helper", "src/main/java/com/foo/Foo.java").qualified_name == "com.foo.Foo#helper"
+    # the type of a variable is unknown
+    assert index.resolve_method("list.add", TEST) is None
+    assert index.resolve_method("foo.make", TEST) is None
+    # neither declared in the file nor statically imported
+    assert index.resolve_method("make", TEST) is None
+    assert index.resolve_method("helper", TEST) is None
+
+
+def test_parsed_blobs_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(symbol_index, "MAX_BLOBS", 2)
+    monkeypatch.setattr(symbol_index, "_blobs", symbol_index.collections.OrderedDict())
+    index = SymbolIndex(*make_repo(tmp_path))
+    assert len(symbol_index._blobs) == 2
+    # the index keeps the symbols of the dropped blobs
+    assert len(index.files) == len(FILES)
+    assert index.resolve_method("check", TEST) is not None
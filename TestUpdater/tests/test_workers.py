@@ -0,0 +1,80 @@
+import os, json, time
+import pytest
+
+pytest.importorskip("langchain_openai")
+import stage_graph
+
+# 3 commits, interleaved in the dataset
+SAMPLES = [{"test_id": 100 + i, "repo_name": "org/repo", "commit_tgt": f"commit{i % 3}"} for i in range(9)]
+
+
+def fake_process_sample(key, value, variants, repo_path, repo_base, lsp, model, candidates):
+    # the samples of the later shards finish first
+    time.sleep(0.01 * (len(SAMPLES) - key))
+    if value["test_id"] == 104:
+        return {variant.name: (None, False) for variant in variants}
+    return {variant.name: ({"test_id": value["test_id"], "commit_tgt": value["commit_tgt"], "test_pass": True}, False)
+            for variant in variants}
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "project.json").write_text(json.dumps(SAMPLES))
+    worktrees = []
+    monkeypatch.setattr(stage_graph, "DATA_BASE", str(tmp_path / "data"))
+    monkeypatch.setattr(stage_graph, "OUTPUT_BASE", str(tmp_path / "output"))
+    monkeypatch.setattr(stage_graph, "WORKTREE_BASE", str(tmp_path / "worktrees"))
+    monkeypatch.setattr(stage_graph, "process_sample", fake_process_sample)
+    monkeypatch.setattr(stage_graph, "start_lsp", lambda repo_path, items: None)
+    monkeypatch.setattr(stage_graph, "setup_worktree", lambda repo_path, worktree, commit: worktrees.append((worktree, commit)))
+    return tmp_path, worktrees
+
+
+def read_output(tmp_path, output_dir):
+    with open(tmp_path / "output" / output_dir / "project.json") as f:
+        return json.load(f)
+
+
+def test_shard_groups_keeps_commits_together():
+    groups = stage_graph.group_by_commit([(i, sample, []) for i, sample in enumerate(SAMPLES)])
+    assert [[key for key, _, _ in group] for group in groups] == [[0, 3, 6], [1, 4, 7], [2, 5, 8]]
+    shards = stage_graph.shard_groups(groups, 2)
+    assert sorted(len(shard) for shard in shards) == [3, 6]
+    # each commit is processed by a single worker
+    owners = {}
+    for i, shard in enumerate(shards):
+        for _, sample, _ in shard:
+            assert owners.setdefault(sample["commit_tgt"], i) == i
+
+
+def test_workers_match_single_worker(project):
+    tmp_path, worktrees = project
+    stage_graph.run_project("project.json", {"pipeline": "single"}, model=None, workers=1)
+    stage_graph.run_project("project.json", {"pipeline": "workers"}, model=None, workers=3)
+    single = read_output(tmp_path, "single")
+    assert [record["test_id"] for record in single] == [sample["test_id"] for sample in SAMPLES if sample["test_id"] != 104]
+    assert read_output(tmp_path, "workers") == single
+    # one worktree per worker, checked out at the commit of its first sample
+    assert sorted(os.path.basename(os.path.dirname(os.path.dirname(worktree))) for worktree, _ in worktrees) == \
+        ["worker_0", "worker_1", "worker_2"]
+    assert sorted(commit for _, commit in worktrees) == ["commit0", "commit1", "commit2"]
+
+
+def test_speculative_worktrees_are_reused_per_worker(tmp_path, monkeypatch):
+    created = []
+    monkeypatch.setattr(stage_graph, "WORKTREE_BASE", str(tmp_path / "worktrees"))
+    monkeypatch.setattr(stage_graph, "setup_worktree", lambda repo_path, worktree, commit: created.append(worktree))
+    monkeypatch.setattr(stage_graph, "setup_repo", lambda repo_name, commit, repo_base: None)
+
+    def bases(repo_base):
+        run = stage_graph.SampleRun.__new__(stage_graph.SampleRun)
+        run.repo_path, run.repo_base, run.value = "/repos/org/repo", repo_base, SAMPLES[0]
+        return run.speculative_bases(2)
+
+    main = bases(stage_graph.REPO_BASE)
+    assert bases(stage_graph.REPO_BASE) == main
+    assert [os.path.basename(base) for base in main] == ["spec_main_1", "spec_main_2"]
+    worker = bases(str(tmp_path / "worktrees" / "worker_1"))
+    assert [os.path.basename(base) for base in worker] == ["spec_worker_1_1", "spec_worker_1_2"]
+    assert len(set(created)) == 4
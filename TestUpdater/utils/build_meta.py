@@ -0,0 +1,163 @@
+"""
+Persistent cache of the build metadata of the Maven modules: module and output directories, upstream modules
+and test classpath. An entry is keyed by a hash of all the pom.xml files of the commit, so it is shared by the
+commits which do not change the build and invalidated by the ones which do.
+"""
+
+import os, re, json, hashlib, subprocess
+import xml.etree.ElementTree as ET
+from .logger import logger
+from .resources import jvm_slot
+
+REPO_ROOT = "${repo_root}"
+CLASSPATH_FILE = "target/test.classpath"
+POM_NS = {"ns": "http://maven.apache.org/POM/4.0.0"}
+
+
+def repo_key(repo_root: str) -> str:
+    """
+    The org/repo of a checkout under REPO_BASE or a worktree, e.g. "prebid/prebid-server-java". Two repos of the same
+    name in different orgs get different keys, the worktrees of one repo share it.
+    """
+    return os.path.join(*os.path.normpath(os.path.abspath(repo_root)).split(os.sep)[-2:])
+
+
+def pom_hash(repo_root: str, commit: str) -> str:
+    """
+    Hash of the paths and blobs of all the pom.xml files at `commit`, read from the git tree without a checkout.
+    """
+    proc = subprocess.run(['git', 'ls-tree', '-r', commit], cwd=repo_root, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    poms = sorted(line for line in proc.stdout.decode().splitlines() if line.endswith("pom.xml"))
+    return hashlib.sha256("\n".join(poms).encode()).hexdigest()[:16]
+
+
+def module_of(changed_test: str) -> str:
+    module = changed_test.split('src/test/java/')[0]
+    if module.endswith('/'):
+        module = module[:-1]
+    return module
+
+
+def output_dirs(repo_root: str, module: str) -> dict:
+    """
+    The output directories of the module, as set in its pom.xml (default target/classes and target/test-classes).
+    """
+    module_root = os.path.join(repo_root, module)
+    dirs = {"classes": "target/classes", "test-classes": "target/test-classes"}
+    try:
+        build = ET.parse(os.path.join(module_root, "pom.xml")).getroot().find("./ns:build", POM_NS)
+    except (OSError, ET.ParseError):
+        build = None
+    if build is not None:
+        for name, tag in (("classes", "outputDirectory"), ("test-classes", "testOutputDirectory")):
+            node = build.find(f"./ns:{tag}", POM_NS)
+            if node is None or not node.text:
+                continue
+            value = node.text.strip().replace("${project.build.directory}", "target")
+            value = re.sub(r"\$\{(project\.)?basedir\}/?", "", value)
+            # other properties are not resolved, keep the default
+            if "${" not in value:
+                dirs[name] = value
+    return {name: os.path.join(module_root, value) for name, value in dirs.items()}
+
+
+def reactor_args(module: str, meta: dict = None) -> list:
+    """
+    The -pl arguments of a build of `module` and its upstream modules: the upstream modules cached in `meta`,
+    otherwise --also-make, which lets Maven resolve the reactor again.
+    """
+    if not module:
+        return []
+    if meta is None:
+        return ['-pl', module, '--also-make']
+    return ['-pl', ",".join([upstream for upstream in meta["upstream"] if upstream] + [module])]
+
+
+def test_compile(mvn: list, repo_root: str, module: str, env: dict, skips: list, goals=(), meta: dict = None) -> subprocess.CompletedProcess:
+    """
+    Compile the main and test classes of the module and its upstream modules, followed by `goals`.
+    """
+    cmd = mvn + ['-T2C', 'test-compile'] + list(goals) + reactor_args(module, meta)
+    cmd.extend(skips)
+    logger.info(' '.join(cmd))
+    with jvm_slot("maven"):
+        return subprocess.run(cmd, cwd=repo_root, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=600)
+
+
+def resolve_build_meta(mvn: list, repo_root: str, module: str, env: dict, skips: list):
+    """
+    Compile the module and its upstream modules, and return its build metadata. Returns None if the build fails.
+    The upstream modules are the reactor modules on the classpath, i.e. resolved to their output directories.
+    """
+    proc = test_compile(mvn, repo_root, module, env, skips, ['dependency:build-classpath', f'-Dmdep.outputFile={CLASSPATH_FILE}'])
+    # the relative outputFile is resolved against the basedir of each module
+    module_root = os.path.join(repo_root, module)
+    classpath_file = os.path.join(module_root, CLASSPATH_FILE)
+    if proc.returncode != 0 or not os.path.exists(classpath_file):
+        logger.info(f"Fail to resolve the build metadata of {module_root}")
+        return None
+    with open(classpath_file, "r", encoding="utf-8") as f:
+        dependencies = [entry for entry in f.read().strip().split(os.pathsep) if entry]
+    outputs = output_dirs(repo_root, module)
+    upstream = []
+    for entry in dependencies:
+        if entry.startswith(repo_root + os.sep) and not entry.endswith(".jar"):
+            upstream_module = re.split(r"(?:^|/)target(?:/|$)", os.path.relpath(entry, repo_root))[0]
+            if upstream_module not in upstream:
+                upstream.append(upstream_module)
+    return {
+        "module": module,
+        "module_dir": module_root,
+        "test_source_dir": os.path.join(module_root, "src/test/java"),
+        "output_dirs": outputs,
+        "upstream": upstream,
+        "classpath": [outputs["test-classes"], outputs["classes"]] + dependencies,
+    }
+
+
+def _anchor(obj, old: str, new: str):
+    # the paths under the repo root are stored relative to it, the entries are shared by the worktrees
+    if isinstance(obj, str):
+        return new + obj[len(old):] if obj == old or obj.startswith(old + os.sep) else obj
+    if isinstance(obj, list):
+        return [_anchor(item, old, new) for item in obj]
+    if isinstance(obj, dict):
+        return {key: _anchor(value, old, new) for key, value in obj.items()}
+    return obj
+
+
+class BuildMetaCache:
+    """
+    Build metadata by (repo, pom hash, module, JDK, Maven), stored as one JSON file per entry under `cache_dir`.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        # pom hash of each (repo root, commit) in this process
+        self._pom_hashes = {}
+
+    def _path(self, repo_root: str, commit: str, module: str, toolchain: tuple) -> str:
+        key = (repo_root, commit)
+        if key not in self._pom_hashes:
+            self._pom_hashes[key] = pom_hash(repo_root, commit)
+        name = (module.replace("/", "__") or "_root") + "@" + "_".join(toolchain) + ".json"
+        return os.path.join(self.cache_dir, repo_key(repo_root), self._pom_hashes[key], name)
+
+    def get(self, repo_root: str, commit: str, module: str, toolchain: tuple):
+        path = self._path(repo_root, commit, module, toolchain)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return _anchor(json.load(f), REPO_ROOT, repo_root)
+        except (OSError, json.JSONDecodeError):
+            logger.warning(f"Skip the broken build metadata {path}")
+            return None
+
+    def put(self, repo_root: str, commit: str, module: str, toolchain: tuple, meta: dict) -> None:
+        path = self._path(repo_root, commit, module, toolchain)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(_anchor(meta, repo_root, REPO_ROOT), commit=commit), f, indent=2)
+        os.replace(tmp_path, path)
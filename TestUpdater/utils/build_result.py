@@ -0,0 +1,275 @@
+"""
+Result of a Maven build: the streamed log lines the pipeline reads, and the Surefire XML reports of the run.
+"""
+
+import os, re, glob, time, signal, threading, contextlib, subprocess, dataclasses, collections
+import xml.etree.ElementTree as ET
+from .logger import logger
+
+# at most this many lines of each kind are kept from the output of a build
+MAX_LINES = 5000
+TAIL_LINES = 200
+
+ERROR_LOCATION = re.compile(r"^\[ERROR\] (\S+\.java):\[\d+,\d+\] ")
+ERROR_COUNT = re.compile(r"^\[INFO\] \d+ errors?\s*$")
+
+
+@dataclasses.dataclass
+class TestCaseResult:
+    """
+    One <testcase> of a Surefire report.
+    """
+    classname: str
+    name: str
+    # passed, failure, error or skipped
+    status: str
+    time: float = 0.0
+    message: str = ""
+    type: str = ""
+    # the whole stack trace, its first line is "<type>: <message>"
+    trace: str = ""
+    # the "at ..." frames of the trace
+    stack: list = dataclasses.field(default_factory=list)
+
+    @property
+    def failed(self) -> bool:
+        return self.status in ("failure", "error")
+
+
+@dataclasses.dataclass
+class BuildResult:
+    returncode: int
+    # lines of the output containing [ERROR], "Tests run" and "BUILD SUCCESS"
+    error_info: list = dataclasses.field(default_factory=list)
+    test_info: list = dataclasses.field(default_factory=list)
+    build_info: list = dataclasses.field(default_factory=list)
+    # the last lines of the output
+    tail: list = dataclasses.field(default_factory=list)
+    # the test cases of the Surefire reports written by this build
+    tests: list = dataclasses.field(default_factory=list)
+    # the build was killed on the compilation errors of the test module
+    aborted: bool = False
+    # the build was killed by its `cancel` event
+    cancelled: bool = False
+
+    @property
+    def build_success(self) -> bool:
+        return len(self.build_info) > 0
+
+    @property
+    def tests_ran(self) -> bool:
+        return len(self.test_info) > 0
+
+    @property
+    def finished(self) -> bool:
+        """
+        Whether Maven ran to its end, an aborted or cancelled build leaves target/ half written.
+        """
+        return not (self.aborted or self.cancelled)
+
+    def failed_tests(self) -> list:
+        return [test for test in self.tests if test.failed]
+
+    def find_test(self, classname: str, name: str = None):
+        """
+        The test case `name` of the test class `classname` (simple or qualified name), None if not reported.
+        """
+        for test in self.tests:
+            if (test.classname == classname or test.classname.endswith("." + classname)) and (name is None or test.name == name):
+                return test
+        return None
+
+
+def compilation_failure(errors: list, project: str) -> list:
+    """
+    The [ERROR] lines of maven-compiler-plugin for the located `errors`, as read by parse_error: once after
+    "COMPILATION ERROR" and once in the "Compilation failure ... [Help 1]" section.
+    """
+    return (
+        ["[ERROR] COMPILATION ERROR : "]
+        + errors
+        + [
+            "[ERROR] Failed to execute goal org.apache.maven.plugins:maven-compiler-plugin:testCompile "
+            f"(default-testCompile) on project {project}: Compilation failure: Compilation failure: "
+        ]
+        + errors
+        + ["[ERROR] -> [Help 1]"]
+    )
+
+
+class CompileErrorWatch:
+    """
+    Follow the "COMPILATION ERROR" blocks of a build, and tell when a complete block has errors under `source_dir`.
+    The detail lines of the block (symbol, location, reason...) are not prefixed by [ERROR], they are kept
+    with the prefix as in the "Compilation failure" section.
+    """
+
+    def __init__(self, source_dir: str):
+        self.source_dir = source_dir.rstrip(os.sep) + os.sep
+        # the errors of the current block, None out of a block
+        self.errors = None
+        # the errors of the block which matched
+        self.block = []
+
+    def feed(self, line: str) -> bool:
+        if "COMPILATION ERROR" in line:
+            self.errors = []
+        elif self.errors is None:
+            pass
+        elif ERROR_COUNT.match(line):
+            errors, self.errors = self.errors, None
+            locations = [ERROR_LOCATION.match(error) for error in errors]
+            if any(match and match.group(1).startswith(self.source_dir) for match in locations):
+                self.block = errors
+                return True
+        elif ERROR_LOCATION.match(line):
+            self.errors.append(line)
+        elif self.errors and (line.startswith("[ERROR]") or not line.startswith("[")):
+            detail = line[len("[ERROR] "):] if line.startswith("[ERROR] ") else line
+            self.errors.append("[ERROR] " + detail)
+        return False
+
+
+def run_maven(cmd: list, cwd: str = None, env: dict = None, timeout: float = None, report_dirs: list = (),
+              abort_on_compile_error: str = None, project: str = "", cancel: threading.Event = None) -> BuildResult:
+    """
+    Run a Maven build and stream its output line by line, only the lines read by the pipeline are kept.
+    The build and its forked JVMs are killed on `timeout`, which raises subprocess.TimeoutExpired like subprocess.run.
+    The Surefire reports written by the build in `report_dirs` and in the directories named by the output are parsed.
+
+    If `abort_on_compile_error` is a source directory, the build is killed as soon as a complete "COMPILATION ERROR"
+    block has errors in it, and the "Compilation failure" section Maven would print is added to error_info.
+    The build is also killed when `cancel` is set, e.g. once a concurrent build of another candidate passed.
+    """
+    start = time.time()
+    error_info, test_info, build_info = [], [], []
+    tail = collections.deque(maxlen=TAIL_LINES)
+    report_dirs = list(report_dirs)
+    watch = CompileErrorWatch(abort_on_compile_error) if abort_on_compile_error else None
+    aborted = False
+    # the index in error_info of the last "COMPILATION ERROR" line
+    block_start = 0
+    proc = subprocess.Popen(
+        cmd, cwd=cwd, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, encoding="utf-8", errors="replace",
+        start_new_session=True,
+    )
+    timed_out = threading.Event()
+    cancelled = threading.Event()
+
+    def kill(reason=timed_out):
+        reason.set()
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def watch_cancel():
+        while proc.poll() is None:
+            if cancel.wait(1):
+                kill(cancelled)
+                return
+
+    timer = threading.Timer(timeout, kill) if timeout else None
+    if timer:
+        timer.start()
+    if cancel is not None:
+        threading.Thread(target=watch_cancel, daemon=True).start()
+    try:
+        for line in proc.stdout:
+            line = line.rstrip("\n")
+            tail.append(line)
+            if "COMPILATION ERROR" in line:
+                block_start = len(error_info)
+            if "[ERROR]" in line and len(error_info) < MAX_LINES:
+                error_info.append(line)
+            if "Tests run" in line and len(test_info) < MAX_LINES:
+                test_info.append(line)
+            if "BUILD SUCCESS" in line:
+                build_info.append(line)
+            match = re.search(r"Please refer to (\S+) for the individual test results", line)
+            if match and match.group(1) not in report_dirs:
+                report_dirs.append(match.group(1))
+            if watch and watch.feed(line):
+                aborted = True
+                break
+        if aborted:
+            with contextlib.suppress(ProcessLookupError):
+                os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+            returncode = 1
+            # the block is replaced by its complete diagnostics, followed by the section printed at the end of a build
+            error_info = error_info[:block_start] + compilation_failure(watch.block, project)
+            logger.info(f"Abort the build on the compilation errors in {abort_on_compile_error}")
+        else:
+            returncode = proc.wait()
+    finally:
+        if timer:
+            timer.cancel()
+        if proc.poll() is None:
+            kill()
+            proc.wait()
+    if timed_out.is_set() and not aborted and not cancelled.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    return BuildResult(
+        returncode=returncode,
+        error_info=error_info,
+        test_info=test_info,
+        build_info=build_info,
+        tail=list(tail),
+        # file times come from a coarse clock, which may lag behind time.time()
+        tests=read_surefire_reports(report_dirs, since=start - 1),
+        aborted=aborted,
+        cancelled=cancelled.is_set(),
+    )
+
+
+def read_surefire_reports(report_dirs: list, since: float = 0.0) -> list:
+    """
+    Parse the TEST-*.xml reports of `report_dirs` modified after `since`, the reports of former builds are left
+    in target/ by the warm builds.
+    """
+    tests = []
+    for report_dir in report_dirs:
+        for path in sorted(glob.glob(os.path.join(report_dir, "TEST-*.xml"))):
+            try:
+                if os.path.getmtime(path) < since:
+                    continue
+                tests.extend(parse_surefire_report(path))
+            except (OSError, ET.ParseError) as e:
+                logger.warning(f"Skip the Surefire report {path}: {e}")
+    return tests
+
+
+def _seconds(value) -> float:
+    # Surefire may format the time with the locale, e.g. "1,234.5"
+    try:
+        return float((value or "0").replace(",", ""))
+    except ValueError:
+        return 0.0
+
+
+def parse_surefire_report(path: str) -> list:
+    tests = []
+    for case in ET.parse(path).getroot().iter("testcase"):
+        status, message, type_, trace = "passed", "", "", ""
+        for tag in ("failure", "error", "skipped"):
+            node = case.find(tag)
+            if node is not None:
+                status = tag
+                message = node.get("message") or ""
+                type_ = node.get("type") or ""
+                trace = (node.text or "").strip()
+                break
+        tests.append(TestCaseResult(
+            classname=case.get("classname") or "",
+            name=case.get("name") or "",
+            status=status,
+            time=_seconds(case.get("time")),
+            message=message,
+            type=type_,
+            trace=trace,
+            stack=[line.strip() for line in trace.splitlines() if line.strip().startswith("at ")],
+        ))
+    return tests
@@ -12,6 +12,45 @@ LANGCHAIN_API_KEY = ""
 DATA_BASE = FILE_BASE + "/data"
 # The path to output results
 OUTPUT_BASE = FILE_BASE + "/output"
+# The path of git worktrees used by parallel workers
+WORKTREE_BASE = FILE_BASE + "/worktrees"
+# The on-disk cache of LLM responses
+LLM_CACHE_PATH = FILE_BASE + "/cache/llm_cache.sqlite"
+LLM_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# The build metadata of the Maven modules (classpath, output directories, upstream modules) by pom hash
+BUILD_META_BASE = FILE_BASE + "/cache/build_meta"
+# Definitions resolved by the language server, one sqlite database per repo
+DEFINITION_CACHE_BASE = FILE_BASE + "/cache/definitions"
+# Resolve the class and method names declared once in scope by a tree-sitter index of the commit, before the language server
+SYMBOL_INDEX = True
+# Machine-wide budget of the JVMs when several projects run at once (pipeline.py -j)
+MAX_JDTLS = 4
+MAX_MAVEN = 8
+JVM_HEAP_BUDGET_GB = 96
+# -Xmx of a JDTLS instance (see eclipse_jdtls.py) and the heap reserved for one Maven build with its forked tests
+JDTLS_HEAP_GB = 16
+MAVEN_HEAP_GB = 4
+# Reuse target/ between the builds of the same commit, only the substituted test file is recompiled
+WARM_BUILD = True
+# Compile the substituted test class with javac before the full Maven run, which is skipped on compile errors
+JAVAC_FAST_PATH = True
+# Candidates sampled by the generate, repair and basic answer stages, built at once in worktrees (1: serial pipeline)
+SPECULATIVE_CANDIDATES = 1
+# Sampling temperature of the candidates after the first one, which keeps the temperature of the model
+SPECULATIVE_TEMPERATURE = 0.8
+
+# Unix socket of the language server pool (python -m utils.lsp_pool), the pipelines start their own server if it is not running
+LSP_POOL_ADDRESS = FILE_BASE + "/lsp_pool.sock"
+# Key authenticating the connections to the pool, if empty the pool writes a random key to LSP_POOL_ADDRESS + ".key" (mode 0600)
+LSP_POOL_AUTHKEY = ""
+# A server of the pool is stopped after this many seconds without a connection
+LSP_POOL_IDLE_SECONDS = 6 * 3600
+# Resident memory of the servers of the pool, the least recently used idle ones are stopped beyond it
+LSP_POOL_MAX_RSS_GB = 64
+# Seconds before a request to the language server is cancelled, its lookups are then skipped
+LSP_REQUEST_TIMEOUT = 120
+# Requests to a language server in flight at once
+LSP_MAX_INFLIGHT = 16
 
 TIME_ZONE = "UTC"
 
@@ -33,6 +72,17 @@ java_dict = {
     "21": "",
     "22": ""
 }
+# "mvn" starts a cold JVM per build, "mvnd" routes the builds through a Maven daemon kept alive per (JDK, Maven) pair
+MAVEN_BACKEND = "mvn"
+# mvnd installations by the Maven version they bundle, the versions without one are built by mvn
+mvnd_dict = {
+    "3.8.6": "",
+    "3.8.1": "",
+    "3.6.3": "",
+    "3.9.9": ""
+}
+# The registries of the Maven daemons, one per (JDK, Maven) pair
+MVND_STORAGE = FILE_BASE + "/mvnd"
 
 src_files = [
     "test_part.json",
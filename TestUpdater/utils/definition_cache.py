@@ -0,0 +1,117 @@
+"""
+Persistent cache of the textDocument/definition lookups of the language server, one sqlite database per repo.
+"""
+
+import os, json, pathlib, hashlib, sqlite3, threading
+from .build_meta import repo_key
+
+REPO_ROOT = "${repo_root}"
+REPO_URI = "${repo_uri}"
+
+
+def content_hash(path: str) -> str:
+    """
+    Hash of the file as the language server reads it, "" if it does not exist.
+    """
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return ""
+
+
+class DefinitionCache:
+    """
+    Locations of the definitions keyed on (commit, content hash of the queried file, line, column).
+    The file is read from the working tree, which holds a substituted test file during the repair, so a lookup
+    is reused only while the file is unchanged. The paths under the repo root are stored relative to it,
+    the entries are shared by the worktrees of the repo.
+    """
+
+    def __init__(self, cache_dir: str, bypass: bool = False):
+        self.cache_dir = cache_dir
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # org/repo -> connection of this process
+        self._conns = {}
+        self._pid = None
+
+    def _connect(self, repo_root: str) -> sqlite3.Connection:
+        # sqlite connections must not be shared with the forked workers
+        if self._pid != os.getpid():
+            self._conns = {}
+            self._pid = os.getpid()
+        repo_name = repo_key(repo_root)
+        if repo_name not in self._conns:
+            path = os.path.join(self.cache_dir, f"{repo_name}.sqlite")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS definitions (key TEXT PRIMARY KEY, locations TEXT)")
+            conn.commit()
+            self._conns[repo_name] = conn
+        return self._conns[repo_name]
+
+    @staticmethod
+    def make_key(commit: str, relative_path: str, digest: str, line: int, column: int) -> str:
+        return f"{commit}:{relative_path}:{digest}:{line}:{column}"
+
+    def get(self, repo_root: str, key: str):
+        if self.bypass:
+            return None
+        with self._lock:
+            row = self._connect(repo_root).execute(
+                "SELECT locations FROM definitions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        text = row[0].replace(REPO_URI, pathlib.Path(repo_root).as_uri()).replace(REPO_ROOT, repo_root)
+        return json.loads(text)
+
+    def put(self, repo_root: str, key: str, locations: list) -> None:
+        if self.bypass:
+            return
+        text = json.dumps(locations, ensure_ascii=False)
+        text = text.replace(pathlib.Path(repo_root).as_uri(), REPO_URI).replace(repo_root, REPO_ROOT)
+        with self._lock:
+            conn = self._connect(repo_root)
+            conn.execute("INSERT OR REPLACE INTO definitions VALUES (?, ?)", (key, text))
+            conn.commit()
+
+    def request_definition(self, lsp, commit: str, relative_path: str, line: int, column: int) -> list:
+        """
+        `lsp.request_definition(relative_path, line, column)`, answered from the cache if the file is unchanged
+        in the checkout of the language server.
+        """
+        return self.request_definitions(lsp, commit, [(relative_path, line, column)])[0]
+
+    def request_definitions(self, lsp, commit: str, requests: list) -> list:
+        """
+        `lsp.request_definitions(requests)` for the (relative path, line, column) requests which are not cached,
+        all of them sent at once. The results are in the order of `requests`.
+        The empty results are not stored, the server may still be indexing the project.
+        """
+        repo_root = lsp.repository_root_path
+        digests = {}
+        keys, results, missing = [], [], []
+        for i, (relative_path, line, column) in enumerate(requests):
+            if relative_path not in digests:
+                digests[relative_path] = content_hash(os.path.join(repo_root, relative_path))
+            keys.append(self.make_key(commit, relative_path, digests[relative_path], line, column))
+            results.append(self.get(repo_root, keys[i]))
+            if results[i] is None:
+                missing.append(i)
+        if missing:
+            responses = lsp.request_definitions([requests[i] for i in missing])
+            for i, locations in zip(missing, responses):
+                results[i] = locations
+                if locations:
+                    self.put(repo_root, keys[i], locations)
+        return results
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "bypass": self.bypass}
@@ -188,13 +188,22 @@ class UpdateRepo(Repo):
         return "\n".join(filter_diff)
 
 
+# UpdateRepo of each (process, repo root), reused while the samples stay at the same commit
+_repos = {}
+
 def setup_repo(
     repo_name: str, commit_id: str, repo_base=REPO_BASE, do_clone=False
 ) -> UpdateRepo:
     repo_root = os.path.join(repo_base, repo_name)
+    key = (os.getpid(), repo_root)
+    repo = _repos.get(key)
+    # skip the forced checkout, which would touch the index and invalidate the language server and build outputs
+    if repo is not None and repo.commit_id == commit_id and repo.head.commit.hexsha == commit_id:
+        return repo
     if os.path.exists(repo_root):
         logger.info(f"Load Repo existing at {repo_root}")
         repo = UpdateRepo(repo_root, commit_id)
+        _repos[key] = repo
         return repo
     else:
         if do_clone:
@@ -229,4 +238,30 @@ def setup_repos_from_names(repo_names: list[str], repo_base=REPO_BASE):
             error_list.append(repo_name)
     logger.info(
         f"Setup {len(repo_names)} repos, {len(error_list)} failed.\nFailed Repos: {', '.join(error_list)}"
-    )
\ No newline at end of file
+    )
+
+def setup_worktree(repo_root: str, worktree_root: str, commit_id: str) -> str:
+    """
+    Create (or reuse) a detached git worktree of the repo at `repo_root`.
+
+    Worktrees share the object store of the main checkout but own their working tree and
+    build outputs, so several workers can checkout, build and reset the same repo in parallel.
+
+        Args:
+            repo_root (str): The path of the main checkout.
+            worktree_root (str): The path of the worktree to create.
+            commit_id (str): The commit to checkout in a newly created worktree.
+
+        Returns:
+            str: The path of the worktree.
+    """
+    repo = Repo(repo_root)
+    if os.path.exists(os.path.join(worktree_root, ".git")):
+        logger.info(f"Reuse worktree existing at {worktree_root}")
+        return worktree_root
+    # drop stale administrative entries of deleted worktrees
+    repo.git.worktree("prune")
+    os.makedirs(os.path.dirname(worktree_root), exist_ok=True)
+    repo.git.worktree("add", "--detach", "-f", worktree_root, commit_id)
+    logger.info(f"Worktree is created at {worktree_root}")
+    return worktree_root
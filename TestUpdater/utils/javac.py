@@ -0,0 +1,64 @@
+"""
+Compile a test class with javac alone, against the test classpath of its Maven module.
+"""
+
+import os, re, shutil, tempfile, subprocess
+from .resources import jvm_slot
+from .build_result import compilation_failure
+
+JAVAC_HEADER = re.compile(r"^(.+\.java):(\d+): (error|warning): (.*)$")
+JAVAC_SUMMARY = re.compile(r"^\d+ (errors?|warnings?)$")
+
+
+def javac_compile(javac: str, classpath: list, sourcepath: str, java_file: str, env: dict):
+    """
+    Compile `java_file` into a scratch directory, returns (returncode, javac output).
+    The other test classes are compiled from `sourcepath` if they are missing from the classpath.
+    """
+    out_dir = tempfile.mkdtemp(prefix="javac_")
+    cmd = [
+        javac, '-d', out_dir,
+        '-cp', os.pathsep.join(classpath),
+        '-sourcepath', sourcepath,
+        '-implicit:none', '-encoding', 'UTF-8', '-nowarn', '-Xmaxerrs', '1000',
+        java_file,
+    ]
+    try:
+        with jvm_slot("maven"):
+            proc = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=300)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return proc.returncode, proc.stderr.decode(errors="replace") + proc.stdout.decode(errors="replace")
+
+
+def to_maven_errors(output: str, project: str) -> list:
+    """
+    Convert the errors of javac into the [ERROR] lines printed by maven-compiler-plugin, i.e.
+        [ERROR] /path/FooTest.java:[12,9] cannot find symbol
+        [ERROR]   symbol:   variable bar
+    listed once after "COMPILATION ERROR" and once in the "Compilation failure ... [Help 1]" section.
+    """
+    lines = output.splitlines()
+    errors = []
+    i = 0
+    while i < len(lines):
+        match = JAVAC_HEADER.match(lines[i])
+        i += 1
+        if not match or match.group(3) != "error":
+            continue
+        path, line_number, message = match.group(1), match.group(2), match.group(4)
+        column = 1
+        # the source line, then a caret under the column
+        if i + 1 < len(lines) and lines[i + 1].strip() == "^":
+            column = lines[i + 1].index("^") + 1
+            i += 2
+        details = []
+        while i < len(lines) and not JAVAC_HEADER.match(lines[i]) and not JAVAC_SUMMARY.match(lines[i]) \
+                and not lines[i].startswith("Note:"):
+            details.append(lines[i])
+            i += 1
+        errors.append(f"[ERROR] {path}:[{line_number},{column}] {message}")
+        errors.extend(f"[ERROR] {detail}" for detail in details)
+    if not errors:
+        return []
+    return compilation_failure(errors, project)
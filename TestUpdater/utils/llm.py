@@ -1,5 +1,6 @@
 from langchain_openai import ChatOpenAI
 from utils.configs import OPENAI_API_KEY, DEEPSEEK_API_KEY
+from utils.ratelimit import RateLimiter
 
 # gpt-4o-mini
 model_gpt4omini = ChatOpenAI(
@@ -29,3 +30,58 @@ model_deepseek = ChatOpenAI(
     model="deepseek-chat",
     temperature=0.1,
 )
+
+model_map = {
+    "deepseek": model_deepseek,
+    "gpt4omini": model_gpt4omini,
+    "llama": model_llama,
+    "gpt41": model_gpt41
+}
+
+# Requests and tokens per minute allowed by each endpoint in model_map (None: no limit)
+rate_limits = {
+    "deepseek": {"rpm": 600, "tpm": 1000000},
+    "gpt4omini": {"rpm": 500, "tpm": 200000},
+    "llama": None,  # local vLLM
+    "gpt41": {"rpm": 500, "tpm": 30000},
+}
+# Max number of requests in flight per endpoint in model_map, split between the workers like the rate limits
+inflight_limits = {
+    "deepseek": 16,
+    "gpt4omini": 16,
+    "llama": 32,
+    "gpt41": 16,
+}
+DEFAULT_INFLIGHT_LIMIT = 8
+_rate_limiters = {}
+_rate_share = 1.0
+
+def model_key(model: ChatOpenAI) -> str:
+    """
+    The key of `model` in model_map, which keys its limits, or its model name for a model outside of it.
+    """
+    return next((k for k, v in model_map.items() if v is model), model.model_name)
+
+def set_rate_share(share: float):
+    """
+    Use only `share` of the rate limits, for processes splitting an endpoint (e.g. parallel workers).
+    """
+    global _rate_share
+    _rate_share = share
+    _rate_limiters.clear()
+
+def get_inflight_limit(model: ChatOpenAI) -> int:
+    return inflight_limits.get(model_key(model), DEFAULT_INFLIGHT_LIMIT)
+
+def get_rate_limiter(model: ChatOpenAI):
+    name = model_key(model)
+    if name not in _rate_limiters:
+        limits = rate_limits.get(name) or {}
+        rpm, tpm = limits.get("rpm"), limits.get("tpm")
+        _rate_limiters[name] = RateLimiter(
+            name,
+            rpm=max(1, int(rpm * _rate_share)) if rpm else None,
+            tpm=max(1, int(tpm * _rate_share)) if tpm else None,
+            max_inflight=max(1, int(get_inflight_limit(model) * _rate_share)),
+        )
+    return _rate_limiters[name]
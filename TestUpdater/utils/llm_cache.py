@@ -0,0 +1,125 @@
+"""
+Persistent content-addressed cache of LLM responses, stored in a sqlite database.
+"""
+
+import os, json, time, hashlib, sqlite3, threading
+from .logger import logger
+
+
+class LLMCache:
+    """
+    Cache LLM responses keyed on (model name, temperature, rendered messages, sample index).
+    The least recently used entries are evicted when the cache is larger than `max_bytes`. The total size
+    is kept in the meta table by triggers, so the processes sharing the database agree on it.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = 1 << 30, bypass: bool = False):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite connections must not be shared with the forked workers
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, timeout=60, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT, size INTEGER, last_access REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+            for trigger in (
+                "CREATE TRIGGER IF NOT EXISTS size_insert AFTER INSERT ON responses BEGIN "
+                "UPDATE meta SET value = value + NEW.size WHERE name = 'total_size'; END",
+                "CREATE TRIGGER IF NOT EXISTS size_delete AFTER DELETE ON responses BEGIN "
+                "UPDATE meta SET value = value - OLD.size WHERE name = 'total_size'; END",
+                "CREATE TRIGGER IF NOT EXISTS size_update AFTER UPDATE OF size ON responses BEGIN "
+                "UPDATE meta SET value = value + NEW.size - OLD.size WHERE name = 'total_size'; END",
+            ):
+                self._conn.execute(trigger)
+            # computed once for a database created without the meta table
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta SELECT 'total_size', COALESCE(SUM(size), 0) FROM responses"
+            )
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def make_key(model, messages, sample: int = 0, temperature: float = None) -> str:
+        """
+        `temperature` is the one the answer is drawn at, if the model is bound to another one than its own.
+        """
+        entry = {
+            "model": model.model_name,
+            "temperature": model.temperature if temperature is None else temperature,
+            "messages": [[m.type, m.content] for m in messages],
+        }
+        # the first sample keeps the key of a single answer
+        if sample:
+            entry["sample"] = sample
+        content = json.dumps(
+            entry,
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def get(self, key: str):
+        if self.bypass:
+            return None
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        if self.bypass:
+            return
+        with self._lock:
+            conn = self._connect()
+            # an upsert, the delete of INSERT OR REPLACE does not fire the triggers
+            conn.execute(
+                "INSERT INTO responses VALUES (?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                "response = excluded.response, size = excluded.size, last_access = excluded.last_access",
+                (key, response, len(response.encode()), time.time()),
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def total_size(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = self.total_size(conn)
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        while total > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM responses ORDER BY last_access LIMIT 256").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+        logger.info(f"LLM cache evicts {evicted} entries.")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "bypass": self.bypass}
@@ -0,0 +1,314 @@
+"""
+Pool of initialized JDTLS servers kept alive across pipeline runs and projects, one per repo root.
+Run `python -m utils.lsp_pool` from TestUpdater, the pipelines connect to it over the unix socket LSP_POOL_ADDRESS
+and fall back to their own language server if it is not running.
+The socket is only accessible to its owner, and the connections are authenticated by the key of pool_authkey.
+"""
+
+import os, time, signal, secrets, argparse, threading, contextlib, subprocess
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from .configs import LSP_POOL_ADDRESS, LSP_POOL_IDLE_SECONDS, LSP_POOL_MAX_RSS_GB, LSP_POOL_AUTHKEY, JDTLS_HEAP_GB
+from .configs import LSP_REQUEST_TIMEOUT, LSP_MAX_INFLIGHT
+from .logger import logger
+from .multilspy import SyncLanguageServer
+from .multilspy.multilspy_config import MultilspyConfig
+from .multilspy.multilspy_exceptions import MultilspyException, MultilspyTimeoutError
+from .multilspy.multilspy_logger import MultilspyLogger
+
+lsp_config = MultilspyConfig.from_dict(
+    {
+        "code_language": "java",
+        "trace_lsp_communication": True,
+        "request_timeout": LSP_REQUEST_TIMEOUT,
+        "max_inflight_requests": LSP_MAX_INFLIGHT,
+    }
+)
+lsp_logger = MultilspyLogger()
+
+
+def kill_server(process) -> None:
+    """
+    Kill the process of a language server if it is still alive, with the JVM under its shell.
+    """
+    if process is not None and process.returncode is None:
+        subprocess.run(["pkill", "-KILL", "-P", str(process.pid)])
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(process.pid, signal.SIGKILL)
+
+def pool_authkey(address: str, create: bool = False) -> bytes:
+    """
+    LSP_POOL_AUTHKEY, else the key in the file `address`.key. With `create`, the pool writes a new random key to it.
+    """
+    if LSP_POOL_AUTHKEY:
+        return LSP_POOL_AUTHKEY.encode()
+    path = address + ".key"
+    if create:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+    with open(path, "rb") as f:
+        return f.read().strip()
+
+def rss_gb(pid: int) -> float:
+    """
+    Resident memory of the process `pid` and its children.
+    """
+    kb = 0
+    children = subprocess.run(["pgrep", "-P", str(pid)], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    for p in [str(pid)] + children.stdout.decode().split():
+        with contextlib.suppress(OSError, ValueError):
+            with open(f"/proc/{p}/status") as f:
+                kb += next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    return kb / 1024 / 1024
+
+
+class PooledServer:
+    """
+    A language server of the pool and the number of connections using it.
+    """
+
+    def __init__(self, repo_root: str):
+        self.repo_root = repo_root
+        self.lsp = SyncLanguageServer.create(lsp_config, lsp_logger, repo_root)
+        self.clients = 0
+        self.last_used = time.monotonic()
+        self.ready = threading.Event()
+        self.error = None
+        self._stack = contextlib.ExitStack()
+
+    @property
+    def process(self):
+        return self.lsp.language_server.server.process
+
+    def start(self) -> None:
+        try:
+            self._stack.enter_context(self.lsp.start_server())
+        except Exception as e:
+            self.error = e
+            kill_server(self.process)
+        finally:
+            self.ready.set()
+
+    def rss_gb(self) -> float:
+        return rss_gb(self.process.pid) if self.ready.is_set() and self.error is None else JDTLS_HEAP_GB
+
+    def stop(self) -> None:
+        # the shutdown request may hang on a broken server, the process is killed anyway
+        closer = threading.Thread(target=self._stack.close, daemon=True)
+        closer.start()
+        closer.join(timeout=60)
+        kill_server(self.process)
+
+
+class LanguageServerPool:
+    """
+    Start a language server on the first connection for a repo root, and keep it after the last connection is closed.
+    The servers idle for `idle_seconds` are stopped, and the least recently used idle servers are stopped
+    before starting a new one if the resident memory of the pool would exceed `max_rss_gb`.
+    """
+
+    def __init__(self, address: str, idle_seconds: float, max_rss_gb: float):
+        self.address = address
+        self.idle_seconds = idle_seconds
+        self.max_rss_gb = max_rss_gb
+        self.servers = {}
+        self._lock = threading.Lock()
+
+    def _make_room(self) -> list:
+        # called with the lock held, returns the servers to stop
+        victims = []
+        used = sum(server.rss_gb() for server in self.servers.values())
+        while used + JDTLS_HEAP_GB > self.max_rss_gb:
+            idle = [server for server in self.servers.values() if server.clients == 0 and server.ready.is_set()]
+            if not idle:
+                logger.warning(f"Language server pool uses {used:.1f}GB, no idle server to evict.")
+                break
+            victim = min(idle, key=lambda server: server.last_used)
+            used -= victim.rss_gb()
+            victims.append(self.servers.pop(victim.repo_root))
+        return victims
+
+    def acquire(self, repo_root: str) -> PooledServer:
+        with self._lock:
+            server = self.servers.get(repo_root)
+            starting = server is None
+            victims = []
+            if starting:
+                victims = self._make_room()
+                server = self.servers[repo_root] = PooledServer(repo_root)
+            server.clients += 1
+        for victim in victims:
+            logger.info(f"Evict the language server of {victim.repo_root}")
+            victim.stop()
+        if starting:
+            logger.info(f"Start a language server for {repo_root}")
+            server.start()
+        server.ready.wait()
+        if server.error is not None:
+            with self._lock:
+                server.clients -= 1
+                if self.servers.get(repo_root) is server:
+                    del self.servers[repo_root]
+            raise server.error
+        return server
+
+    def release(self, server: PooledServer) -> None:
+        with self._lock:
+            server.clients -= 1
+            server.last_used = time.monotonic()
+
+    def evict_idle(self) -> None:
+        while True:
+            time.sleep(60)
+            now = time.monotonic()
+            with self._lock:
+                idle = [
+                    server for server in self.servers.values()
+                    if server.clients == 0 and server.ready.is_set() and now - server.last_used > self.idle_seconds
+                ]
+                for server in idle:
+                    del self.servers[server.repo_root]
+            for server in idle:
+                logger.info(f"Stop the idle language server of {server.repo_root}")
+                server.stop()
+
+    def handle(self, conn) -> None:
+        """
+        Serve one pipeline: ("open", repo root), then ("call", method, args) for the request methods and
+        latency_histograms. Each message is answered by ("ok", result), ("timeout", (method, timeout)) or ("error", message).
+        """
+        server = None
+        try:
+            while True:
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    break
+                try:
+                    if message[0] == "open" and server is None:
+                        server = self.acquire(message[1])
+                        result = None
+                    elif message[0] == "call" and server is not None and (
+                        message[1].startswith("request_") or message[1] == "latency_histograms"
+                    ):
+                        result = getattr(server.lsp, message[1])(*message[2])
+                        server.last_used = time.monotonic()
+                    else:
+                        raise MultilspyException(f"Unexpected message {message[:2]}")
+                except MultilspyTimeoutError as e:
+                    conn.send(("timeout", (e.method, e.timeout)))
+                except Exception as e:
+                    conn.send(("error", repr(e)))
+                else:
+                    conn.send(("ok", result))
+        finally:
+            if server is not None:
+                self.release(server)
+            conn.close()
+
+    def serve(self) -> None:
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        os.makedirs(os.path.dirname(self.address) or ".", exist_ok=True)
+        authkey = pool_authkey(self.address, create=True)
+        # the socket is created with mode 0600
+        umask = os.umask(0o177)
+        try:
+            listener = Listener(self.address, family="AF_UNIX", authkey=authkey)
+        finally:
+            os.umask(umask)
+        threading.Thread(target=self.evict_idle, daemon=True).start()
+        logger.info(f"Language server pool listens on {self.address}")
+        with listener:
+            try:
+                while True:
+                    try:
+                        conn = listener.accept()
+                    except (AuthenticationError, OSError, EOFError) as e:
+                        logger.warning(f"Reject a connection to the language server pool: {e!r}")
+                        continue
+                    threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+            finally:
+                for server in list(self.servers.values()):
+                    server.stop()
+
+
+class PooledLanguageServer:
+    """
+    The language server of the pool for `repository_root_path`, with the request methods of SyncLanguageServer.
+    """
+
+    def __init__(self, address: str, repository_root_path: str):
+        self.address = address
+        self.repository_root_path = repository_root_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def start_server(self):
+        """
+        Connect to the pool and wait until the server of the repo is initialized.
+        """
+        self._conn = Client(self.address, family="AF_UNIX", authkey=pool_authkey(self.address))
+        try:
+            self._send("open", self.repository_root_path)
+            yield self
+        finally:
+            self._conn.close()
+            self._conn = None
+
+    def _send(self, *message):
+        with self._lock:
+            self._conn.send(message)
+            status, result = self._conn.recv()
+        if status == "timeout":
+            raise MultilspyTimeoutError(*result)
+        if status == "error":
+            raise MultilspyException(result)
+        return result
+
+    def request_definition(self, file_path: str, line: int, column: int):
+        return self._send("call", "request_definition", (file_path, line, column))
+
+    def request_definitions(self, requests: list):
+        return self._send("call", "request_definitions", (list(requests),))
+
+    def request_references(self, file_path: str, line: int, column: int):
+        return self._send("call", "request_references", (file_path, line, column))
+
+    def request_document_symbols(self, relative_file_path: str):
+        return self._send("call", "request_document_symbols", (relative_file_path,))
+
+    def request_hover(self, relative_file_path: str, line: int, column: int):
+        return self._send("call", "request_hover", (relative_file_path, line, column))
+
+    def latency_histograms(self) -> dict:
+        """
+        The latencies of the pooled server, including the requests of the other pipelines.
+        """
+        return self._send("call", "latency_histograms", ())
+
+
+def pool_available(address: str = LSP_POOL_ADDRESS) -> bool:
+    """
+    Whether a pool listens on `address` and accepts our key, a socket file may be left by a killed pool.
+    """
+    if not address or not os.path.exists(address):
+        return False
+    try:
+        Client(address, family="AF_UNIX", authkey=pool_authkey(address)).close()
+        return True
+    except (OSError, EOFError, AuthenticationError):
+        return False
+
+
+if __name__ == "__main__":
+    logger.set_log_file("logs/lsp_pool.log")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--address", type=str, default=LSP_POOL_ADDRESS, help='Unix socket of the pool.')
+    parser.add_argument("--idle", type=float, default=LSP_POOL_IDLE_SECONDS, help='Seconds before an unused server is stopped.')
+    parser.add_argument("--max-rss", type=float, default=LSP_POOL_MAX_RSS_GB, help='Resident memory (GB) of the servers of the pool.')
+    args = parser.parse_args()
+    LanguageServerPool(args.address, args.idle, args.max_rss).serve()
@@ -6,6 +6,7 @@ The details of Language Specific configuration are not exposed to the user.
 """
 
 import asyncio
+import collections
 import dataclasses
 import json
 import logging
@@ -28,6 +29,15 @@ from .multilspy_utils import PathUtils, FileUtils, TextUtils
 from pathlib import PurePath
 from typing import AsyncIterator, Iterator, List, Dict, Union, Tuple
 from .type_helpers import ensure_all_methods_implemented
+from .lsp_tracer import LspTracer
+
+
+def _file_stat(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
 
 
 @dataclasses.dataclass
@@ -51,6 +61,9 @@ class LSPFileBuffer:
     # reference count of the file
     ref_count: int
 
+    # (mtime, size) of the file on disk when the contents were read, None if it was not found
+    stat: Tuple[int, int] = None
+
 
 class LanguageServer:
     """
@@ -135,9 +148,12 @@ class LanguageServer:
         self.completions_available = asyncio.Event()
 
         if config.trace_lsp_communication:
-
-            def logging_fn(source, target, msg):
-                self.logger.log(f"LSP: {source} -> {target}: {str(msg)}", logging.DEBUG)
+            logging_fn = LspTracer(
+                logger,
+                max_chars=config.trace_payload_chars,
+                sample_every=config.trace_sample_every,
+                ring_size=config.trace_ring_size,
+            )
 
         else:
 
@@ -147,11 +163,16 @@ class LanguageServer:
         # cmd is obtained from the child classes, which provide the language specific command to start the language server
         # LanguageServerHandler provides the functionality to start the language server and communicate with it
         self.server: LanguageServerHandler = LanguageServerHandler(
-            process_launch_info, logger=logging_fn
+            process_launch_info,
+            logger=logging_fn,
+            request_timeout=config.request_timeout,
+            max_inflight_requests=config.max_inflight_requests,
         )
 
         self.language_id = language_id
-        self.open_file_buffers: Dict[str, LSPFileBuffer] = {}
+        # open documents, from the least to the most recently used
+        self.open_file_buffers: Dict[str, LSPFileBuffer] = collections.OrderedDict()
+        self.max_open_files = config.max_open_files
 
     @asynccontextmanager
     async def start_server(self) -> AsyncIterator["LanguageServer"]:
@@ -178,6 +199,9 @@ class LanguageServer:
     def open_file(self, relative_file_path: str) -> Iterator[None]:
         """
         Open a file in the Language Server. This is required before making any requests to the Language Server.
+        The document is kept open after the request, and synchronized with the file on disk by a didChange
+        when it is opened again. At most `max_open_files` unused documents are kept open, and the other
+        open documents changed on disk (e.g. by a checkout) are synchronized first.
 
         :param relative_file_path: The relative path of the file to open.
         """
@@ -188,6 +212,8 @@ class LanguageServer:
             )
             raise MultilspyException("Language Server not started")
 
+        self._sync_open_files()
+
         absolute_file_path = str(
             PurePath(self.repository_root_path, relative_file_path)
         )
@@ -195,17 +221,21 @@ class LanguageServer:
 
         if uri in self.open_file_buffers:
             assert self.open_file_buffers[uri].uri == uri
-            assert self.open_file_buffers[uri].ref_count >= 1
+            assert self.open_file_buffers[uri].ref_count >= 0
 
-            self.open_file_buffers[uri].ref_count += 1
-            yield
-            self.open_file_buffers[uri].ref_count -= 1
+            self._sync_file_buffer(
+                self.open_file_buffers[uri],
+                FileUtils.read_file(self.logger, absolute_file_path),
+            )
+            self.open_file_buffers[uri].stat = _file_stat(absolute_file_path)
+            self.open_file_buffers.move_to_end(uri)
         else:
+            stat = _file_stat(absolute_file_path)
             contents = FileUtils.read_file(self.logger, absolute_file_path)
 
             version = 0
             self.open_file_buffers[uri] = LSPFileBuffer(
-                uri, contents, version, self.language_id, 1
+                uri, contents, version, self.language_id, 0, stat
             )
 
             self.server.notify.did_open_text_document(
@@ -218,18 +248,89 @@ class LanguageServer:
                     }
                 }
             )
+        # the document stays open after the request, it is closed when evicted
+        self.open_file_buffers[uri].ref_count += 1
+        try:
             yield
+        finally:
             self.open_file_buffers[uri].ref_count -= 1
+            self._evict_file_buffers()
 
-        if self.open_file_buffers[uri].ref_count == 0:
-            self.server.notify.did_close_text_document(
-                {
-                    LSPConstants.TEXT_DOCUMENT: {
-                        LSPConstants.URI: uri,
+    def _sync_file_buffer(self, file_buffer: LSPFileBuffer, contents: str) -> None:
+        """
+        Send the change of an open document to `contents` as one incremental edit, the range between
+        the common prefix and the common suffix of the old and new contents.
+        """
+        old = file_buffer.contents
+        if old == contents:
+            return
+        prefix = 0
+        limit = min(len(old), len(contents))
+        while prefix < limit and old[prefix] == contents[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == contents[-1 - suffix]:
+            suffix += 1
+        start_line, start_col = TextUtils.get_line_col_from_index(old, prefix)
+        end_line, end_col = TextUtils.get_line_col_from_index(old, len(old) - suffix)
+        file_buffer.version += 1
+        file_buffer.contents = contents
+        self.server.notify.did_change_text_document(
+            {
+                LSPConstants.TEXT_DOCUMENT: {
+                    LSPConstants.VERSION: file_buffer.version,
+                    LSPConstants.URI: file_buffer.uri,
+                },
+                LSPConstants.CONTENT_CHANGES: [
+                    {
+                        LSPConstants.RANGE: {
+                            "start": {"line": start_line, "character": start_col},
+                            "end": {"line": end_line, "character": end_col},
+                        },
+                        "text": contents[prefix : len(contents) - suffix],
                     }
+                ],
+            }
+        )
+
+    def _sync_open_files(self) -> None:
+        """
+        Synchronize the open documents which are not in use with the files on disk, if their mtime or size changed.
+        The documents of the deleted files are closed.
+        """
+        for uri, file_buffer in list(self.open_file_buffers.items()):
+            if file_buffer.ref_count > 0:
+                continue
+            absolute_file_path = PathUtils.uri_to_path(uri)
+            stat = _file_stat(absolute_file_path)
+            if stat == file_buffer.stat:
+                continue
+            if stat is None:
+                self._close_file_buffer(uri)
+                continue
+            self._sync_file_buffer(file_buffer, FileUtils.read_file(self.logger, absolute_file_path))
+            file_buffer.stat = stat
+
+    def _close_file_buffer(self, uri: str) -> None:
+        self.server.notify.did_close_text_document(
+            {
+                LSPConstants.TEXT_DOCUMENT: {
+                    LSPConstants.URI: uri,
                 }
-            )
-            del self.open_file_buffers[uri]
+            }
+        )
+        del self.open_file_buffers[uri]
+
+    def _evict_file_buffers(self) -> None:
+        """
+        Close the least recently used documents which are not in use, beyond `max_open_files`.
+        """
+        for uri in list(self.open_file_buffers):
+            if len(self.open_file_buffers) <= self.max_open_files:
+                break
+            if self.open_file_buffers[uri].ref_count > 0:
+                continue
+            self._close_file_buffer(uri)
 
     def insert_text_at_position(
         self, relative_file_path: str, line: int, column: int, text_to_be_inserted: str
@@ -489,6 +590,23 @@ class LanguageServer:
 
         return ret
 
+    async def request_definitions(
+        self, requests: List[Tuple[str, int, int]]
+    ) -> List[List[multilspy_types.Location]]:
+        """
+        Raise the [textDocument/definition](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_definition) requests
+        for all the (relative file path, line, column) of `requests` at once, and wait for all the responses.
+
+        :param requests: The (relative file path, line, column) of the symbols for which definitions should be looked up
+
+        :return List[List[multilspy_types.Location]]: The locations where each symbol is defined, in the order of `requests`
+        """
+        return list(
+            await asyncio.gather(
+                *(self.request_definition(file_path, line, column) for file_path, line, column in requests)
+            )
+        )
+
     async def request_references(
         self, relative_file_path: str, line: int, column: int
     ) -> List[multilspy_types.Location]:
@@ -743,6 +861,12 @@ class LanguageServer:
 
         return multilspy_types.Hover(**response)
 
+    def latency_histograms(self) -> Dict[str, dict]:
+        """
+        The latency histogram of the requests of each LSP method sent so far, see LatencyHistogram.to_dict.
+        """
+        return {method: histogram.to_dict() for method, histogram in list(self.server.latencies.items())}
+
 
 @ensure_all_methods_implemented(LanguageServer)
 class SyncLanguageServer:
@@ -756,6 +880,10 @@ class SyncLanguageServer:
         self.loop = None
         self.loop_thread = None
 
+    @property
+    def repository_root_path(self) -> str:
+        return self.language_server.repository_root_path
+
     @classmethod
     def create(
         cls, config: MultilspyConfig, logger: MultilspyLogger, repository_root_path: str
@@ -872,6 +1000,22 @@ class SyncLanguageServer:
         ).result()
         return result
 
+    def request_definitions(
+        self, requests: List[Tuple[str, int, int]]
+    ) -> List[List[multilspy_types.Location]]:
+        """
+        Raise the [textDocument/definition](https://microsoft.github.io/language-server-protocol/specifications/lsp/3.17/specification/#textDocument_definition) requests
+        for all the (relative file path, line, column) of `requests` at once, and wait for all the responses.
+
+        :param requests: The (relative file path, line, column) of the symbols for which definitions should be looked up
+
+        :return List[List[multilspy_types.Location]]: The locations where each symbol is defined, in the order of `requests`
+        """
+        result = asyncio.run_coroutine_threadsafe(
+            self.language_server.request_definitions(requests), self.loop
+        ).result()
+        return result
+
     def request_references(
         self, file_path: str, line: int, column: int
     ) -> List[multilspy_types.Location]:
@@ -950,3 +1094,9 @@ class SyncLanguageServer:
             self.loop,
         ).result()
         return result
+
+    def latency_histograms(self) -> Dict[str, dict]:
+        """
+        The latency histogram of the requests of each LSP method sent so far, see LatencyHistogram.to_dict.
+        """
+        return self.language_server.latency_histograms()
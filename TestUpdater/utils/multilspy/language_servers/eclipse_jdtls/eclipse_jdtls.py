@@ -4,6 +4,7 @@ Provides Java specific instantiation of the LanguageServer class. Contains vario
 
 import asyncio
 import dataclasses
+import hashlib
 import json
 import logging
 import os
@@ -24,6 +25,11 @@ from ...multilspy_utils import FileUtils
 from ...multilspy_utils import PlatformUtils
 from pathlib import PurePath
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 
 @dataclasses.dataclass
 class RuntimeDependencyPaths:
@@ -60,15 +66,17 @@ class EclipseJDTLS(LanguageServer):
         runtime_dependency_paths = self.setupRuntimeDependencies(logger, config)
         self.runtime_dependency_paths = runtime_dependency_paths
 
-        # ws_dir is the workspace directory for the EclipseJDTLS server
+        # ws_dir is the workspace directory for the EclipseJDTLS server, stable per repository so that
+        # a restarted server reuses the imported projects of the previous one
         ws_dir = str(
             PurePath(
                 MultilspySettings.get_language_server_directory(),
                 "EclipseJDTLS",
                 "workspaces",
-                uuid.uuid4().hex,
+                hashlib.sha256(os.path.abspath(repository_root_path).encode()).hexdigest()[:32],
             )
         )
+        ws_dir = self._lock_workspace(ws_dir, logger)
 
         # shared_cache_location is the global cache used by Eclipse JDTLS across all workspaces
         shared_cache_location = str(
@@ -156,6 +164,35 @@ class EclipseJDTLS(LanguageServer):
             "java",
         )
 
+    def _lock_workspace(self, ws_dir: str, logger: MultilspyLogger) -> str:
+        """
+        Lock the stable workspace `ws_dir` for this server with flock, the lock is released by the OS if the
+        process dies. If another server holds it (e.g. the pool and a fallback server on the same repository),
+        a workspace of this process is used instead, and removed when the server stops.
+        """
+        self._workspace_lock = None
+        self._private_workspace = None
+        os.makedirs(os.path.dirname(ws_dir), exist_ok=True)
+        if fcntl is not None:
+            lock = open(ws_dir + ".lock", "w")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._workspace_lock = lock
+                return ws_dir
+            except OSError:
+                lock.close()
+        self._private_workspace = f"{ws_dir}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        logger.log(f"Workspace {ws_dir} is in use, start in {self._private_workspace}", logging.INFO)
+        return self._private_workspace
+
+    def _release_workspace(self) -> None:
+        if self._workspace_lock is not None:
+            self._workspace_lock.close()
+            self._workspace_lock = None
+        if self._private_workspace is not None:
+            shutil.rmtree(self._private_workspace, ignore_errors=True)
+            self._private_workspace = None
+
     def setupRuntimeDependencies(
         self, logger: MultilspyLogger, config: MultilspyConfig
     ) -> RuntimeDependencyPaths:
@@ -436,6 +473,14 @@ class EclipseJDTLS(LanguageServer):
         self.server.on_notification("textDocument/publishDiagnostics", do_nothing)
         self.server.on_notification("language/actionableNotification", do_nothing)
 
+        try:
+            async with self._start_server():
+                yield self
+        finally:
+            self._release_workspace()
+
+    @asynccontextmanager
+    async def _start_server(self) -> AsyncIterator["EclipseJDTLS"]:
         async with super().start_server():
             self.logger.log("Starting EclipseJDTLS server process", logging.INFO)
             await self.server.start()
@@ -29,18 +29,33 @@ SOFTWARE.
 """
 
 import asyncio
+import bisect
+import contextlib
 import dataclasses
 import json
 import os
+import time
 from typing import Any, Dict, List, Optional, Union
 
 from .lsp_requests import LspNotification, LspRequest
 from .lsp_types import ErrorCodes
+from ..multilspy_exceptions import MultilspyTimeoutError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 StringDict = Dict[str, Any]
 PayloadLike = Union[List[StringDict], StringDict, None]
 CONTENT_LENGTH = "Content-Length: "
 ENCODING = "utf-8"
+# bytes read from the stdout of the server at once
+READ_CHUNK = 1 << 16
+# requests without deadline, the server may import the whole project before answering
+UNTIMED_METHODS = ("initialize",)
+# upper bounds (seconds) of the buckets of the latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float("inf"))
 
 
 @dataclasses.dataclass
@@ -95,8 +110,29 @@ class StopLoopException(Exception):
     pass
 
 
+def dumps(payload: PayloadLike) -> bytes:
+    """
+    Encode the payload with orjson if it is installed, json handles the payloads orjson rejects (e.g. big integers).
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload)
+        except TypeError:
+            pass
+    return json.dumps(payload, check_circular=False, ensure_ascii=False, separators=(",", ":")).encode(ENCODING)
+
+
+def loads(body: bytes) -> PayloadLike:
+    """
+    Decode a body, orjson.JSONDecodeError is a json.JSONDecodeError.
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
 def create_message(payload: PayloadLike):
-    body = json.dumps(payload, check_circular=False, ensure_ascii=False, separators=(",", ":")).encode(ENCODING)
+    body = dumps(payload)
     return (
         f"Content-Length: {len(body)}\r\n".encode(ENCODING),
         "Content-Type: application/vscode-jsonrpc; charset=utf-8\r\n\r\n".encode(ENCODING),
@@ -112,20 +148,20 @@ class MessageType:
 
 
 class Request:
+    """
+    A request waiting for its response, resolved from the read loop without a task.
+    """
+
     def __init__(self) -> None:
-        self.cv = asyncio.Condition()
-        self.result: Optional[PayloadLike] = None
-        self.error: Optional[Error] = None
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
 
-    async def on_result(self, params: PayloadLike) -> None:
-        self.result = params
-        async with self.cv:
-            self.cv.notify()
+    def on_result(self, params: PayloadLike) -> None:
+        if not self.future.done():
+            self.future.set_result(params)
 
-    async def on_error(self, err: Error) -> None:
-        self.error = err
-        async with self.cv:
-            self.cv.notify()
+    def on_error(self, err: Error) -> None:
+        if not self.future.done():
+            self.future.set_exception(err)
 
 
 def content_length(line: bytes) -> Optional[int]:
@@ -139,6 +175,89 @@ def content_length(line: bytes) -> Optional[int]:
     return None
 
 
+class LatencyHistogram:
+    """
+    Latencies of the requests of one method, counted in LATENCY_BUCKETS.
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0.0
+        self.max = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.timeouts += timed_out
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the quantile `q`, the max latency for the last bucket.
+        """
+        rank = q * sum(self.counts)
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+        return 0.0
+
+    def to_dict(self) -> StringDict:
+        count = sum(self.counts)
+        return {
+            "count": count,
+            "timeouts": self.timeouts,
+            "mean": self.total / count if count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": {f"<={bound}s": n for bound, n in zip(LATENCY_BUCKETS, self.counts) if n},
+        }
+
+
+class FrameParser:
+    """
+    Split the bytes read from the server into the bodies of the messages, whatever the chunks they are read in.
+    A header block without a valid Content-Length is skipped.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """
+        Append `data` to the buffer and return the bodies completed by it.
+        """
+        buffer = self.buffer
+        buffer += data
+        bodies = []
+        start = 0
+        while True:
+            end = buffer.find(b"\r\n\r\n", start)
+            if end < 0:
+                break
+            num_bytes = None
+            for line in bytes(buffer[start:end]).split(b"\r\n"):
+                try:
+                    num_bytes = content_length(line)
+                except ValueError:
+                    continue
+                if num_bytes is not None:
+                    break
+            if num_bytes is None:
+                start = end + 4
+                continue
+            if len(buffer) - end - 4 < num_bytes:
+                break
+            bodies.append(bytes(buffer[end + 4 : end + 4 + num_bytes]))
+            start = end + 4 + num_bytes
+        del buffer[:start]
+        return bodies
+
+
 class LanguageServerHandler:
     """
     This class provides the implementation of Python client for the Language Server Protocol.
@@ -167,18 +286,28 @@ class LanguageServerHandler:
             that handle notifications from the server.
         logger: An optional function that takes two strings (source and destination) and
             a payload dictionary, and logs the communication between the client and the server.
-        tasks: A dictionary that maps task ids to asyncio.Task objects that represent
-            the asynchronous tasks created by the handler.
-        task_counter: An integer that represents the next available task id for the handler.
+        tasks: A set of the asyncio.Task objects created by the handler which are not done yet,
+            the finished tasks remove themselves.
+        request_timeout: Seconds before a request is cancelled with $/cancelRequest and raises
+            MultilspyTimeoutError, None to wait forever.
+        latencies: A dictionary that maps method names to the LatencyHistogram of their requests.
         loop: An asyncio.AbstractEventLoop object that represents the event loop used by the handler.
     """
 
-    def __init__(self, process_launch_info: ProcessLaunchInfo, logger=None) -> None:
+    def __init__(
+        self,
+        process_launch_info: ProcessLaunchInfo,
+        logger=None,
+        request_timeout: Optional[float] = None,
+        max_inflight_requests: Optional[int] = None,
+    ) -> None:
         """
         Params:
             cmd: A string that represents the command to launch the language server process.
             logger: An optional function that takes two strings (source and destination) and
                 a payload dictionary, and logs the communication between the client and the server.
+            request_timeout: Seconds before a request is cancelled, None to wait forever.
+            max_inflight_requests: Requests sent at once, the others wait until one is answered. None for no limit.
         """
         self.send = LspRequest(self.send_request)
         self.notify = LspNotification(self.send_notification)
@@ -192,9 +321,11 @@ class LanguageServerHandler:
         self.on_request_handlers = {}
         self.on_notification_handlers = {}
         self.logger = logger
-        self.tasks = {}
-        self.task_counter = 0
+        self.tasks = set()
         self.loop = None
+        self.request_timeout = request_timeout
+        self._inflight = asyncio.Semaphore(max_inflight_requests) if max_inflight_requests else None
+        self.latencies: Dict[str, LatencyHistogram] = {}
 
     async def start(self) -> None:
         """
@@ -213,19 +344,17 @@ class LanguageServerHandler:
         )
 
         self.loop = asyncio.get_event_loop()
-        self.tasks[self.task_counter] = self.loop.create_task(self.run_forever())
-        self.task_counter += 1
-        self.tasks[self.task_counter] = self.loop.create_task(self.run_forever_stderr())
-        self.task_counter += 1
+        self._create_task(self.run_forever())
+        self._create_task(self.run_forever_stderr())
 
     async def stop(self) -> None:
         """
         Sends the terminate signal to the language server process and waits for it to exit, with a timeout, killing it if necessary
         """
-        for task in self.tasks.values():
+        for task in list(self.tasks):
             task.cancel()
 
-        self.tasks = {}
+        self.tasks = set()
 
         process = self.process
         self.process = None
@@ -261,30 +390,36 @@ class LanguageServerHandler:
         if self.logger:
             self.logger("client", "logger", message)
 
+    def _dump_trace(self, reason: str) -> None:
+        """
+        Log the recent payloads kept by the tracer, if the logger is an LspTracer
+        """
+        dump = getattr(self.logger, "dump", None)
+        if dump is not None:
+            dump(reason)
+
+    def _create_task(self, coro) -> asyncio.Task:
+        """
+        Run the coroutine in a task kept in self.tasks until it is done
+        """
+        task = asyncio.get_event_loop().create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
     async def run_forever(self) -> bool:
         """
         Continuously read from the language server process stdout and handle the messages
         invoking the registered response and notification handlers
         """
+        parser = FrameParser()
         try:
             while self.process and self.process.stdout and not self.process.stdout.at_eof():
-                line = await self.process.stdout.readline()
-                if not line:
+                data = await self.process.stdout.read(READ_CHUNK)
+                if not data:
                     continue
-                try:
-                    num_bytes = content_length(line)
-                except ValueError:
-                    continue
-                if num_bytes is None:
-                    continue
-                while line and line.strip():
-                    line = await self.process.stdout.readline()
-                if not line:
-                    continue
-                body = await self.process.stdout.readexactly(num_bytes)
-
-                self.tasks[self.task_counter] = asyncio.get_event_loop().create_task(self._handle_body(body))
-                self.task_counter += 1
+                for body in parser.feed(data):
+                    await self._handle_body(body)
         except (BrokenPipeError, ConnectionResetError, StopLoopException):
             pass
         return self._received_shutdown
@@ -304,16 +439,40 @@ class LanguageServerHandler:
 
     async def _handle_body(self, body: bytes) -> None:
         """
-        Parse the body text received from the language server process and invoke the appropriate handler
+        Parse the body text received from the language server process and invoke the appropriate handler.
+        The responses and notifications are handled inline, in the order of the wire, the requests of the server
+        in a task. The notification handlers must therefore not wait for a response of the server.
         """
         try:
-            await self._receive_payload(json.loads(body))
+            payload = loads(body)
         except IOError as ex:
             self._log(f"malformed {ENCODING}: {ex}")
+            self._dump_trace(f"malformed {ENCODING}")
         except UnicodeDecodeError as ex:
             self._log(f"malformed {ENCODING}: {ex}")
+            self._dump_trace(f"malformed {ENCODING}")
         except json.JSONDecodeError as ex:
             self._log(f"malformed JSON: {ex}")
+            self._dump_trace("malformed JSON")
+        else:
+            if isinstance(payload, dict) and "method" not in payload and "id" in payload:
+                self._receive_response(payload)
+            elif isinstance(payload, dict) and "method" in payload and "id" in payload:
+                self._create_task(self._receive_payload(payload))
+            else:
+                await self._receive_payload(payload)
+
+    def _receive_response(self, payload: StringDict) -> None:
+        """
+        Resolve the request of a response received from the server
+        """
+        if self.logger:
+            self.logger("server", "client", payload)
+        try:
+            self._response_handler(payload)
+        except Exception as err:
+            self._log(f"Error handling server payload: {err}")
+            self._dump_trace(f"error handling server payload: {err}")
 
     async def _receive_payload(self, payload: StringDict) -> None:
         """
@@ -328,11 +487,12 @@ class LanguageServerHandler:
                 else:
                     await self._notification_handler(payload)
             elif "id" in payload:
-                await self._response_handler(payload)
+                self._response_handler(payload)
             else:
                 self._log(f"Unknown payload type: {payload}")
         except Exception as err:
             self._log(f"Error handling server payload: {err}")
+            self._dump_trace(f"error handling server payload: {err}")
 
     def send_notification(self, method: str, params: Optional[dict] = None) -> None:
         """
@@ -344,34 +504,49 @@ class LanguageServerHandler:
         """
         Send response to the given request id to the server with the given parameters
         """
-        self.tasks[self.task_counter] = asyncio.get_event_loop().create_task(
-            self._send_payload(make_response(request_id, params))
-        )
-        self.task_counter += 1
+        self._create_task(self._send_payload(make_response(request_id, params)))
 
     def send_error_response(self, request_id: Any, err: Error) -> None:
         """
         Send error response to the given request id to the server with the given error
         """
-        self.tasks[self.task_counter] = asyncio.get_event_loop().create_task(
-            self._send_payload(make_error_response(request_id, err))
-        )
-        self.task_counter += 1
+        self._create_task(self._send_payload(make_error_response(request_id, err)))
 
     async def send_request(self, method: str, params: Optional[dict] = None) -> None:
         """
-        Send request to the server, register the request id, and wait for the response
+        Send request to the server, register the request id, and wait for the response.
+        The request waits for a slot if max_inflight_requests requests are in flight. If it is not answered
+        within request_timeout, or the caller is cancelled, the server is sent $/cancelRequest.
+        """
+        timeout = None if method in UNTIMED_METHODS else self.request_timeout
+        async with self._inflight or contextlib.nullcontext():
+            request = Request()
+            request_id = self.request_id
+            self.request_id += 1
+            self._response_handlers[request_id] = request
+            start = time.monotonic()
+            timed_out = False
+            try:
+                await self._send_payload(make_request(method, request_id, params))
+                return await asyncio.wait_for(request.future, timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                self._cancel_request(request_id)
+                self._log(f"{method} request {request_id} timed out after {timeout}s")
+                raise MultilspyTimeoutError(method, timeout) from None
+            except asyncio.CancelledError:
+                self._cancel_request(request_id)
+                raise
+            finally:
+                self._response_handlers.pop(request_id, None)
+                self.latencies.setdefault(method, LatencyHistogram()).record(time.monotonic() - start, timed_out)
+
+    def _cancel_request(self, request_id: int) -> None:
+        """
+        Tell the server to stop working on the request, its response is then ignored
         """
-        request = Request()
-        request_id = self.request_id
-        self.request_id += 1
-        self._response_handlers[request_id] = request
-        async with request.cv:
-            await self._send_payload(make_request(method, request_id, params))
-            await request.cv.wait()
-        if isinstance(request.error, Error):
-            raise request.error
-        return request.result
+        with contextlib.suppress(BrokenPipeError, ConnectionResetError, RuntimeError):
+            self.notify.cancel_request({"id": request_id})
 
     def _send_payload_sync(self, payload: StringDict) -> None:
         """
@@ -382,7 +557,7 @@ class LanguageServerHandler:
         msg = create_message(payload)
         if self.logger:
             self.logger("client", "server", payload)
-        self.process.stdin.writelines(msg)
+        self.process.stdin.write(b"".join(msg))
 
     async def _send_payload(self, payload: StringDict) -> None:
         """
@@ -393,7 +568,7 @@ class LanguageServerHandler:
         msg = create_message(payload)
         if self.logger:
             self.logger("client", "server", payload)
-        self.process.stdin.writelines(msg)
+        self.process.stdin.write(b"".join(msg))
         await self.process.stdin.drain()
 
     def on_request(self, method: str, cb) -> None:
@@ -408,17 +583,22 @@ class LanguageServerHandler:
         """
         self.on_notification_handlers[method] = cb
 
-    async def _response_handler(self, response: StringDict) -> None:
+    def _response_handler(self, response: StringDict) -> None:
         """
         Handle the response received from the server for a request, using the id to determine the request
         """
-        request = self._response_handlers.pop(response["id"])
+        request = self._response_handlers.pop(response["id"], None)
+        if request is None:
+            # the request was cancelled while waiting for its response
+            self._log(f"response to an unknown request {response['id']}")
+            return
         if "result" in response and "error" not in response:
-            await request.on_result(response["result"])
+            request.on_result(response["result"])
         elif "result" not in response and "error" in response:
-            await request.on_error(Error.from_lsp(response["error"]))
+            self._dump_trace(f"error response to request {response['id']}: {response['error']}")
+            request.on_error(Error.from_lsp(response["error"]))
         else:
-            await request.on_error(Error(ErrorCodes.InvalidRequest, ""))
+            request.on_error(Error(ErrorCodes.InvalidRequest, ""))
 
     async def _request_handler(self, response: StringDict) -> None:
         """
@@ -472,3 +652,4 @@ class LanguageServerHandler:
                         }
                     ),
                 )
+                self._dump_trace(f"error handling the notification {method}: {ex}")
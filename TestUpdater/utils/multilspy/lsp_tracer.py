@@ -0,0 +1,89 @@
+"""
+This module provides the tracer of the JSON-RPC communication between the client and the language server.
+"""
+
+import collections
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any
+
+from .multilspy_logger import MultilspyLogger, has_reader
+
+# notifications sent in floods by the servers, only one in `sample_every` is logged
+NOISY_METHODS = frozenset(
+    ["$/progress", "window/logMessage", "textDocument/publishDiagnostics", "language/status"]
+)
+
+
+class LspTracer:
+    """
+    Trace the payloads exchanged with the language server, callable as the logger of LanguageServerHandler.
+
+    The payloads are only formatted if a handler of the multilspy logger emits records of `level`, the noisy
+    notifications are sampled and the payloads are truncated to `max_chars`. The last `ring_size` payloads are
+    kept unformatted in memory, and logged as errors by `dump` when the communication fails.
+    """
+
+    def __init__(
+        self,
+        logger: MultilspyLogger,
+        level: int = logging.DEBUG,
+        max_chars: int = 2000,
+        sample_every: int = 100,
+        ring_size: int = 200,
+    ) -> None:
+        self.logger = logger
+        self.level = level
+        self.max_chars = max_chars
+        self.sample_every = sample_every
+        self.ring = collections.deque(maxlen=ring_size) if ring_size > 0 else None
+        self.counts = collections.Counter()
+        self.live = False
+        self._next_refresh = 0.0
+
+    def _is_live(self) -> bool:
+        # the handlers may be changed while the server runs, they are checked every few seconds
+        now = time.monotonic()
+        if now >= self._next_refresh:
+            self.live = has_reader(self.logger.logger, self.level)
+            self._next_refresh = now + 5
+        return self.live
+
+    def _sampled_out(self, payload: Any) -> bool:
+        method = payload.get("method") if isinstance(payload, dict) else None
+        if method not in NOISY_METHODS or self.sample_every <= 1:
+            return False
+        self.counts[method] += 1
+        return self.counts[method] % self.sample_every != 1
+
+    def format(self, payload: Any) -> str:
+        if isinstance(payload, str):
+            text = payload
+        else:
+            text = json.dumps(payload, ensure_ascii=False, default=str)
+        if len(text) > self.max_chars:
+            text = text[: self.max_chars] + f"... ({len(text) - self.max_chars} more chars)"
+        return text
+
+    def __call__(self, source: str, target: str, payload: Any) -> None:
+        if self.ring is not None:
+            self.ring.append((time.time(), source, target, payload))
+        if not self._is_live() or self._sampled_out(payload):
+            return
+        self.logger.log(f"LSP: {source} -> {target}: {self.format(payload)}", self.level)
+
+    def dump(self, reason: str) -> None:
+        """
+        Log the payloads of the ring buffer as an error, and clear it.
+        """
+        if not self.ring:
+            return
+        entries = list(self.ring)
+        self.ring.clear()
+        lines = [f"LSP: {reason}, the last {len(entries)} messages were:"]
+        for created, source, target, payload in entries:
+            created = datetime.fromtimestamp(created).strftime("%H:%M:%S.%f")[:-3]
+            lines.append(f"[{created}] {source} -> {target}: {self.format(payload)}")
+        self.logger.log("\n".join(lines), logging.ERROR)
@@ -25,6 +25,18 @@ class MultilspyConfig:
     """
     code_language: Language
     trace_lsp_communication: bool = False
+    # payloads longer than this are truncated in the trace
+    trace_payload_chars: int = 2000
+    # only one in this many progress, log and diagnostics notifications is traced
+    trace_sample_every: int = 100
+    # payloads kept in memory and logged when the communication fails
+    trace_ring_size: int = 200
+    # documents kept open in the language server after their last request, the least recently used are closed
+    max_open_files: int = 64
+    # seconds before a request is cancelled and raises MultilspyTimeoutError, None to wait forever
+    request_timeout: float = None
+    # requests sent to the language server at once, the others wait for a slot
+    max_inflight_requests: int = 32
 
     @classmethod
     def from_dict(cls, env: dict):
@@ -11,4 +11,15 @@ class MultilspyException(Exception):
         """
         Initializes the exception with the given message.
         """
-        super().__init__(message)
\ No newline at end of file
+        super().__init__(message)
+
+
+class MultilspyTimeoutError(MultilspyException):
+    """
+    Raised when the language server does not answer a request before its deadline, the request is cancelled.
+    """
+
+    def __init__(self, method: str, timeout: float):
+        super().__init__(f"{method} request timed out after {timeout}s")
+        self.method = method
+        self.timeout = timeout
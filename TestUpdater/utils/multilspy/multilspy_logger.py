@@ -2,23 +2,27 @@
 Multilspy logger module.
 """
 
-import inspect
+import json
 import logging
+import os
+import sys
 from datetime import datetime
-from pydantic import BaseModel
 
 
-class LogLine(BaseModel):
+def has_reader(logger: logging.Logger, level: int) -> bool:
     """
-    Represents a line in the Multilspy log
+    Whether a record of `level` sent to `logger` would be emitted by a handler, i.e. whether formatting it is useful.
     """
-
-    time: str
-    level: str
-    caller_file: str
-    caller_name: str
-    caller_line: int
-    message: str
+    if not logger.isEnabledFor(level):
+        return False
+    current = logger
+    while current:
+        if any(level >= handler.level for handler in current.handlers):
+            return True
+        if not current.propagate:
+            return False
+        current = current.parent
+    return logging.lastResort is not None and level >= logging.lastResort.level
 
 
 class MultilspyLogger:
@@ -36,32 +40,27 @@ class MultilspyLogger:
         self, debug_message: str, level: int, sanitized_error_message: str = ""
     ) -> None:
         """
-        Log the debug and santized messages using the logger
+        Log the debug and santized messages using the logger, as a line of JSON
+        (json.dumps with its default separators, as LogLine.json() wrote it with pydantic 1).
+        Nothing is formatted if no handler would emit the record.
         """
+        if not has_reader(self.logger, level):
+            return
 
         debug_message = debug_message.replace("'", '"').replace("\n", " ")
-        sanitized_error_message = sanitized_error_message.replace("'", '"').replace(
-            "\n", " "
-        )
 
-        # Collect details about the callee
-        curframe = inspect.currentframe()
-        calframe = inspect.getouterframes(curframe, 2)
-        caller_file = calframe[1][1].split("/")[-1]
-        caller_line = calframe[1][2]
-        caller_name = calframe[1][3]
-
-        # Construct the debug log line
-        debug_log_line = LogLine(
-            time=str(datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
-            level=logging.getLevelName(level),
-            caller_file=caller_file,
-            caller_name=caller_name,
-            caller_line=caller_line,
-            message=debug_message,
-        )
+        # Collect details about the callee, without inspecting the source of the stack
+        caller = sys._getframe(1)
+        debug_log_line = {
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "level": logging.getLevelName(level),
+            "caller_file": os.path.basename(caller.f_code.co_filename),
+            "caller_name": caller.f_code.co_name,
+            "caller_line": caller.f_lineno,
+            "message": debug_message,
+        }
 
         self.logger.log(
             level=level,
-            msg=debug_log_line.json(),
+            msg=json.dumps(debug_log_line),
         )
@@ -17,6 +17,9 @@ def ensure_all_methods_implemented(
 
     def check_all_methods_implemented(target_cls: R) -> R:
         for name, _ in inspect.getmembers(source_cls, inspect.isfunction):
+            # the private helpers of source_cls are not part of its interface
+            if name.startswith("_") and not name.startswith("__"):
+                continue
             if name not in target_cls.__dict__ or not callable(target_cls.__dict__[name]):
                 raise NotImplementedError(f"{name} is not implemented in {target_cls}")
 
@@ -0,0 +1,67 @@
+"""
+Per-project progress and ETA of a multi-project run.
+"""
+
+import time
+from .logger import logger
+
+
+class ProgressBoard:
+    """
+    Collect the ("start", project, total) / ("done", project) / ("end", project) events sent by the project
+    processes, and log a table of the progress and ETA of each project.
+    """
+
+    def __init__(self, projects: list):
+        self.projects = list(projects)
+        self.total = {}
+        self.done = {project: 0 for project in projects}
+        self.started = {}
+        self.ended = {}
+
+    def update(self, event: tuple) -> None:
+        kind, project = event[0], event[1]
+        if kind == "start":
+            self.total[project] = event[2]
+            self.started[project] = time.monotonic()
+        elif kind == "done":
+            self.done[project] += 1
+        elif kind == "end":
+            self.ended[project] = time.monotonic()
+
+    def eta(self, project: str):
+        """
+        Seconds left for `project` at its rate so far, None if it has no finished sample yet.
+        """
+        done, total = self.done[project], self.total.get(project, 0)
+        if project in self.ended or done >= total:
+            return 0.0
+        if done == 0:
+            return None
+        elapsed = time.monotonic() - self.started[project]
+        return elapsed / done * (total - done)
+
+    @staticmethod
+    def _fmt(seconds) -> str:
+        if seconds is None:
+            return "--:--:--"
+        seconds = int(seconds)
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+    def render(self, usage: str = "") -> str:
+        lines = [f"{'project':<48} {'done':>11} {'elapsed':>9} {'eta':>9}"]
+        for project in self.projects:
+            if project not in self.started:
+                lines.append(f"{project:<48} {'queued':>11}")
+                continue
+            end = self.ended.get(project, time.monotonic())
+            status = f"{self.done[project]}/{self.total[project]}"
+            lines.append(
+                f"{project:<48} {status:>11} {self._fmt(end - self.started[project]):>9} {self._fmt(self.eta(project)):>9}"
+            )
+        if usage:
+            lines.append(usage)
+        return "\n".join(lines)
+
+    def log(self, usage: str = "") -> None:
+        logger.info("Progress\n" + self.render(usage))
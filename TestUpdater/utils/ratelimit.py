@@ -0,0 +1,139 @@
+"""
+Token-bucket rate limiting of the LLM requests, per model endpoint.
+"""
+
+import time, asyncio, threading
+from .logger import logger
+
+# rough number of characters per token, used to estimate the tokens of a request
+CHARS_PER_TOKEN = 4
+# retries of a request rejected with HTTP 429
+MAX_RETRIES = 5
+DEFAULT_RETRY_AFTER = 10.0
+# seconds between two checks for a free slot when `max_inflight` requests are in flight
+INFLIGHT_POLL = 0.05
+
+
+class TokenBucket:
+    """
+    A bucket refilled continuously up to `capacity` within every `period` seconds.
+    The level may go negative, which delays the following requests until the debt is refilled.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # a request larger than the bucket only waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self.level -= amount
+
+
+class RateLimiter:
+    """
+    Limit the requests per minute (rpm), tokens per minute (tpm) and requests in flight of one model endpoint,
+    for all the threads and event loops of the process. No delay is added as long as there is headroom.
+    A request holds its in-flight slot from `acquire` until `release`.
+    """
+
+    def __init__(self, name: str, rpm: int = None, tpm: int = None, max_inflight: int = None):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """
+        Consume the budget of a request if available, otherwise return the seconds to wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.blocked_until - now)
+            if self.max_inflight and self.inflight >= self.max_inflight:
+                wait = max(wait, INFLIGHT_POLL)
+            if self.requests:
+                wait = max(wait, self.requests.wait_time(1, now))
+            if self.tokens:
+                wait = max(wait, self.tokens.wait_time(tokens, now))
+            if wait == 0.0:
+                self.inflight += 1
+                if self.requests:
+                    self.requests.consume(1)
+                if self.tokens:
+                    self.tokens.consume(tokens)
+            return wait
+
+    def acquire(self, tokens: int) -> None:
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0.0:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int) -> None:
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0.0:
+                return
+            await asyncio.sleep(wait)
+
+    def release(self) -> None:
+        """
+        Free the in-flight slot of a request acquired before, once it is answered or failed.
+        """
+        with self._lock:
+            self.inflight -= 1
+
+    def consume_tokens(self, tokens: int) -> None:
+        """
+        Account the tokens known only after the response, e.g. the completion.
+        """
+        if self.tokens:
+            with self._lock:
+                self.tokens.consume(tokens)
+
+    def block(self, seconds: float) -> None:
+        """
+        Stop all requests for `seconds`, as asked by the retry-after header of a 429 response.
+        """
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        logger.warning(f"Rate limited by {self.name}, retry after {seconds:.1f}s.")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def retry_after(error: Exception):
+    """
+    Return the seconds to wait if `error` is a HTTP 429 response, otherwise None.
+    """
+    if getattr(error, "status_code", None) != 429:
+        return None
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return DEFAULT_RETRY_AFTER
@@ -0,0 +1,126 @@
+"""
+Machine-wide budget of the JVMs started by the pipeline, shared by the project processes and their workers.
+"""
+
+import os, time, contextlib, multiprocessing
+from .logger import logger
+
+_budget = None
+
+
+def _alive(pid: int) -> bool:
+    """
+    Whether the process `pid` is running, a zombie (killed but not reaped yet) is not.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+class ResourceBudget:
+    """
+    Limit the number of concurrent JDTLS instances, concurrent Maven builds and their total JVM heap (GB).
+    Each slot records the pid of its owner in shared memory, the budget must be created before the processes are
+    forked. The slots of a process killed without releasing them (OOM killer, worker timeout) are reclaimed by
+    the processes waiting for a slot.
+    """
+
+    def __init__(self, max_jdtls: int, max_maven: int, heap_gb: int, jdtls_heap_gb: int, maven_heap_gb: int):
+        self.limits = {"jdtls": max_jdtls, "maven": max_maven}
+        self.heap_gb = heap_gb
+        self.heaps = {"jdtls": jdtls_heap_gb, "maven": maven_heap_gb}
+        self._cond = multiprocessing.Condition()
+        # the pid owning each slot, 0 for a free slot
+        self._owners = {kind: multiprocessing.RawArray("i", limit) for kind, limit in self.limits.items()}
+
+    def _used(self, kind: str) -> int:
+        return sum(1 for pid in self._owners[kind] if pid)
+
+    def _heap_used(self) -> int:
+        return sum(self._used(kind) * self.heaps[kind] for kind in self.limits)
+
+    def _reclaim(self) -> None:
+        # called with the condition held
+        for kind, owners in self._owners.items():
+            for i, pid in enumerate(owners):
+                if pid and not _alive(pid):
+                    logger.warning(f"Reclaim the {kind} slot of the dead process {pid}")
+                    owners[i] = 0
+
+    def _available(self, kind: str) -> bool:
+        if self._used(kind) >= self.limits[kind]:
+            return False
+        heap_used = self._heap_used()
+        heap = heap_used + self.heaps[kind]
+        # a language server lives as long as its project, always leave room for one build
+        if kind == "jdtls":
+            heap += self.heaps["maven"]
+        # the first JVM is always admitted, even if its heap alone exceeds the budget
+        return heap <= self.heap_gb or heap_used == 0
+
+    def acquire(self, kind: str) -> float:
+        """
+        Block until a `kind` JVM fits the budget, return the seconds waited.
+        """
+        start = time.monotonic()
+        with self._cond:
+            while not self._available(kind):
+                self._reclaim()
+                if self._available(kind):
+                    break
+                self._cond.wait(timeout=30)
+            owners = self._owners[kind]
+            owners[list(owners).index(0)] = os.getpid()
+        return time.monotonic() - start
+
+    def release(self, kind: str) -> None:
+        with self._cond:
+            owners = self._owners[kind]
+            pid = os.getpid()
+            if pid in owners:
+                owners[list(owners).index(pid)] = 0
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, kind: str):
+        waited = self.acquire(kind)
+        if waited > 1:
+            logger.info(f"[{os.getpid()}] waited {waited:.0f}s for a {kind} slot")
+        try:
+            yield
+        finally:
+            self.release(kind)
+
+    def usage(self) -> str:
+        return (
+            f"jdtls {self._used('jdtls')}/{self.limits['jdtls']}, "
+            f"maven {self._used('maven')}/{self.limits['maven']}, "
+            f"heap {self._heap_used()}/{self.heap_gb}GB"
+        )
+
+
+def set_budget(budget: ResourceBudget):
+    """
+    Install `budget` for this process and the processes forked from it.
+    """
+    global _budget
+    _budget = budget
+
+def get_budget():
+    return _budget
+
+def jvm_slot(kind: str):
+    """
+    Hold a slot of the installed budget, no limit if no budget is installed (e.g. a single project).
+    """
+    if _budget is None:
+        return contextlib.nullcontext()
+    return _budget.slot(kind)
@@ -0,0 +1,115 @@
+"""
+Append-only JSONL checkpoint of the pipeline outputs.
+"""
+
+import os, json
+from .logger import logger
+
+
+class ResultSink:
+    """
+    Append each finished sample as one line of `<output>.jsonl`, and compact the lines into the
+    JSON list `<output>.json` (ordered as the dataset) at the end of a run.
+
+    Lines are flushed after every append and fsynced every `fsync_every` appends, a torn last line
+    left by a crash is ignored when the checkpoint is read again.
+    """
+
+    def __init__(self, json_file: str, resume: bool = True, fsync_every: int = 8):
+        self.json_file = json_file
+        self.jsonl_file = os.path.splitext(json_file)[0] + ".jsonl"
+        self.fsync_every = fsync_every
+        self._pending = 0
+        os.makedirs(os.path.dirname(self.jsonl_file) or ".", exist_ok=True)
+
+        if not resume and os.path.exists(self.jsonl_file):
+            os.remove(self.jsonl_file)
+        if resume and not os.path.exists(self.jsonl_file) and os.path.exists(self.json_file):
+            self._seed_from_json()
+        self._drop_torn_line()
+        self.done = set(self.read().keys()) if resume else set()
+        if self.done:
+            logger.info(f"Continue processing, {len(self.done)} items are done in {self.jsonl_file}")
+        self._f = open(self.jsonl_file, "a", encoding="utf-8")
+
+    def _seed_from_json(self):
+        # outputs written by the former JSON-only format
+        with open(self.json_file, "r", encoding="utf-8") as f:
+            content = json.load(f)
+        with open(self.jsonl_file, "w", encoding="utf-8") as f:
+            for record in content or []:
+                f.write(json.dumps(record) + "\n")
+        logger.info(f"Seed {self.jsonl_file} with {len(content or [])} items of {self.json_file}")
+
+    def _drop_torn_line(self):
+        # a crash in the middle of a write leaves a line without "\n", new lines must not be appended to it
+        if not os.path.exists(self.jsonl_file):
+            return
+        with open(self.jsonl_file, "rb+") as f:
+            content = f.read()
+            if content and not content.endswith(b"\n"):
+                f.truncate(content.rfind(b"\n") + 1)
+                logger.warning(f"Drop the torn last line of {self.jsonl_file}")
+
+    def read(self) -> dict:
+        """
+        Return the checkpointed records by test_id, the later line wins.
+        """
+        records = {}
+        if not os.path.exists(self.jsonl_file):
+            return records
+        with open(self.jsonl_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skip a broken line in {self.jsonl_file}")
+                    continue
+                records[record["test_id"]] = record
+        return records
+
+    def is_done(self, test_id) -> bool:
+        return test_id in self.done
+
+    def append(self, record: dict) -> None:
+        self._f.write(json.dumps(record) + "\n")
+        self._f.flush()
+        self.done.add(record["test_id"])
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            self.sync()
+
+    def skip(self, test_id) -> None:
+        """
+        Mark a sample without output as done, it is dropped by compact().
+        """
+        self.append({"test_id": test_id, "skipped": True})
+
+    def sync(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pending = 0
+
+    def compact(self, test_ids: list) -> list:
+        """
+        Write the JSON list of the checkpointed records in the order of `test_ids`.
+        """
+        self.sync()
+        records = self.read()
+        outputs = [
+            records[test_id]
+            for test_id in test_ids
+            if test_id in records and not records[test_id].get("skipped")
+        ]
+        tmp_file = self.json_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(outputs, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.json_file)
+        return outputs
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self.sync()
+            self._f.close()
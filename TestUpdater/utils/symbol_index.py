@@ -0,0 +1,213 @@
+"""
+Index of the Java symbols of a commit (classes, methods, fields and imports), parsed by tree-sitter from the
+git tree, as a fast alternative to the definition requests of the language server.
+"""
+
+import os, dataclasses, collections
+from git import Repo
+from .parser import parser, get_text
+from .logger import logger
+
+CLASS_TYPES = ("class_declaration", "interface_declaration", "enum_declaration", "record_declaration", "annotation_type_declaration")
+METHOD_TYPES = ("method_declaration", "constructor_declaration")
+
+# symbols and imports parsed from each blob, by blob sha, shared by the commits of this process;
+# the least recently used blobs beyond MAX_BLOBS are dropped
+MAX_BLOBS = 50000
+_blobs = collections.OrderedDict()
+# the index of the last commit of each repo root in this process
+_indexes = {}
+
+
+@dataclasses.dataclass(frozen=True)
+class Symbol:
+    # class, method, constructor or field
+    kind: str
+    name: str
+    # package.Outer.Inner for a class, package.Outer.Inner#name for a member
+    qualified_name: str
+    # qualified name of the enclosing class, "" for a top-level class
+    owner: str
+    path: str
+    # lines of the declaration, index from 0
+    start_line: int
+    end_line: int
+    # the declaration without its body, e.g. "public int foo(int x) throws E"
+    signature: str = ""
+
+    def location(self) -> dict:
+        """
+        The symbol as a Location of the language server, as read by get_function and get_class.
+        """
+        return {
+            "relativePath": self.path,
+            "range": {
+                "start": {"line": self.start_line, "character": 0},
+                "end": {"line": self.end_line, "character": 0},
+            },
+        }
+
+
+def _flatten(text: bytes) -> str:
+    return " ".join(text.decode(errors="replace").split()).rstrip(";").strip()
+
+def _signature(node) -> str:
+    body = node.child_by_field_name("body")
+    end = body.start_byte if body is not None else node.end_byte
+    return _flatten(node.text[: end - node.start_byte])
+
+def _ends_with(name: str, suffix: str) -> bool:
+    return name == suffix or name.endswith("." + suffix)
+
+def parse_symbols(path: str, code: bytes):
+    """
+    The symbols declared by the Java file `path` and its imports.
+    """
+    tree = parser.parse(code)
+    package, imports, symbols = "", [], []
+
+    def visit(node, owner: str):
+        for child in node.children:
+            if child.type in CLASS_TYPES:
+                name = get_text(child.child_by_field_name("name"))
+                qualified = f"{owner or package}.{name}".lstrip(".")
+                symbols.append(Symbol("class", name, qualified, owner, path, child.start_point[0], child.end_point[0], _signature(child)))
+                body = child.child_by_field_name("body")
+                if body is not None:
+                    visit(body, qualified)
+            elif child.type in METHOD_TYPES and owner:
+                name = get_text(child.child_by_field_name("name"))
+                kind = "method" if child.type == "method_declaration" else "constructor"
+                symbols.append(Symbol(kind, name, f"{owner}#{name}", owner, path, child.start_point[0], child.end_point[0], _signature(child)))
+            elif child.type in ("field_declaration", "constant_declaration") and owner:
+                for declarator in child.children_by_field_name("declarator"):
+                    name = get_text(declarator.child_by_field_name("name"))
+                    symbols.append(Symbol("field", name, f"{owner}#{name}", owner, path, child.start_point[0], child.end_point[0], _signature(child)))
+            elif child.type == "enum_body_declarations":
+                visit(child, owner)
+
+    for child in tree.root_node.children:
+        if child.type == "package_declaration":
+            package = _flatten(child.text)[len("package"):].strip()
+        elif child.type == "import_declaration":
+            imports.append(_flatten(child.text)[len("import"):].strip())
+    visit(tree.root_node, "")
+    return package, imports, symbols
+
+
+class SymbolIndex:
+    """
+    The symbols of all the .java files of `commit`, read from the object store without a checkout.
+    A name is resolved only if a single declaration is in scope of the querying file, the other names
+    (library symbols, overloads, same name in several classes, calls on variables) are left to the language server.
+    """
+
+    def __init__(self, repo: Repo, commit: str):
+        self.commit = commit
+        # path -> (package, imports)
+        self.files = {}
+        # simple name -> symbols
+        self.symbols = {}
+        parsed = 0
+        for item in repo.commit(commit).tree.traverse():
+            if item.type != "blob" or not item.path.endswith(".java"):
+                continue
+            if item.hexsha in _blobs:
+                _blobs.move_to_end(item.hexsha)
+            else:
+                _blobs[item.hexsha] = parse_symbols(item.path, item.data_stream.read())
+                parsed += 1
+            package, imports, symbols = _blobs[item.hexsha]
+            self.files[item.path] = (package, imports)
+            for symbol in symbols:
+                # a blob may be shared by several paths, e.g. a copied file
+                if symbol.path != item.path:
+                    symbol = dataclasses.replace(symbol, path=item.path)
+                self.symbols.setdefault(symbol.name, []).append(symbol)
+        while len(_blobs) > MAX_BLOBS:
+            _blobs.popitem(last=False)
+        logger.info(f"Symbol index of {commit[:6]}: {len(self.files)} files, {parsed} parsed.")
+
+    def in_scope(self, symbol: Symbol, path: str) -> bool:
+        """
+        Whether the class of `symbol` is visible from the file `path` without qualification: same file,
+        same package or imported.
+        """
+        if symbol.path == path:
+            return True
+        package, imports = self.files.get(path, ("", []))
+        top_level = self.files.get(symbol.path, ("", []))[0]
+        if top_level == package:
+            return True
+        owner = symbol.qualified_name if symbol.kind == "class" else symbol.owner
+        for name in imports:
+            if name.startswith("static "):
+                name = name[len("static "):].strip()
+            if name.endswith(".*"):
+                if (owner + ".").startswith(name[:-1]):
+                    return True
+            elif owner == name or owner.startswith(name + ".") or f"{owner}.{symbol.name}" == name:
+                return True
+        return False
+
+    def _resolve(self, name: str, kinds: tuple, path: str):
+        qualifier, _, simple = name.rpartition(".")
+        symbols = [s for s in self.symbols.get(simple, []) if s.kind in kinds]
+        if qualifier:
+            # Outer.Inner, pkg.Class or Class.member; a variable qualifier is not a class name and is ignored
+            qualified = [s for s in symbols if _ends_with(s.owner, qualifier) or _ends_with(s.qualified_name, name)]
+            symbols = qualified or symbols
+        for scope in (lambda s: s.path == path, lambda s: self.in_scope(s, path)):
+            narrowed = [s for s in symbols if scope(s)]
+            if narrowed:
+                symbols = narrowed
+                break
+        else:
+            return None
+        return symbols[0] if len(symbols) == 1 else None
+
+    def statically_imported(self, symbol: Symbol, path: str) -> bool:
+        """
+        Whether the member `symbol` is imported by an `import static` of the file `path`.
+        """
+        for name in self.files.get(path, ("", []))[1]:
+            if name.startswith("static "):
+                name = name[len("static "):].strip()
+                if name in (f"{symbol.owner}.{symbol.name}", f"{symbol.owner}.*"):
+                    return True
+        return False
+
+    def resolve_method(self, name: str, path: str):
+        """
+        The single method (or constructor) `name` of the file `path` for an unqualified call, of the class named
+        by the qualifier for Class.method, or statically imported. None to ask the language server, e.g. for
+        list.add whose receiver type is unknown, or for an inherited method.
+        """
+        qualifier, _, simple = name.rpartition(".")
+        symbols = [s for s in self.symbols.get(simple, []) if s.kind in ("method", "constructor")]
+        if qualifier in ("", "this"):
+            narrowed = [s for s in symbols if s.path == path]
+            if not narrowed and not qualifier:
+                narrowed = [s for s in symbols if self.statically_imported(s, path)]
+        else:
+            owner = self.resolve_class(qualifier, path)
+            narrowed = [s for s in symbols if owner is not None and s.owner == owner.qualified_name]
+        return narrowed[0] if len(narrowed) == 1 else None
+
+    def resolve_class(self, name: str, path: str):
+        """
+        The single class `name` in scope of the file `path`, None to ask the language server.
+        """
+        return self._resolve(name, ("class",), path)
+
+
+def symbol_index(repo: Repo, commit: str) -> SymbolIndex:
+    """
+    The index of `commit`, the samples of one commit share it.
+    """
+    key = (os.getpid(), repo.working_tree_dir)
+    index = _indexes.get(key)
+    if index is None or index.commit != commit:
+        index = SymbolIndex(repo, commit)
+        _indexes[key] = index
+    return index
@@ -78,6 +78,18 @@ def parse_java_version(repo_path):
             return version
     return None
 
+def mvn_command(env):
+    """
+    mvn, or the mvnd of the Maven at env['MAVEN_HOME'] with a daemon per (JAVA_HOME, MAVEN_HOME) pair if maven_backend is "mvnd".
+    """
+    mvn_version = next((k for k, v in mvn_dict.items() if v and v == env.get('MAVEN_HOME')), None)
+    mvnd_home = mvnd_dict.get(mvn_version) if maven_backend == "mvnd" else None
+    if not mvnd_home:
+        return ["mvn"]
+    jdk_version = next((k for k, v in jdk_path.items() if v and v == env.get('JAVA_HOME')), "default")
+    storage = os.path.abspath(os.path.join(mvnd_storage, f"jdk{jdk_version}_mvn{mvn_version}"))
+    return [os.path.join(mvnd_home, "bin", "mvnd"), f"-Dmvnd.daemonStorage={storage}", "-Dmvnd.rawStreams=true"]
+
 @func_set_timeout(timeout)
 def run_test_with_time_limit(mvnw, env, test_case, repo_path, module, command=None):
     path_env = env["PATH"]
@@ -99,6 +111,8 @@ def run_test_with_time_limit(mvnw, env, test_case, repo_path, module, command=No
 
     if module:
         default = default[:2] + ["-pl",f"{module}", "--also-make"] + default[2:]
+    if not mvnw:
+        default = mvn_command(env) + default[1:]
     
     default.extend(MVN_SKIPS)
     logging.info(' '.join(default))
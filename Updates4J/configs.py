@@ -17,6 +17,16 @@ mvn_dict = {
     "3.8.6": "",
     "3.9.9": ""
 }
+# "mvn" starts a cold JVM per build, "mvnd" routes the builds through a Maven daemon kept alive per (JDK, Maven) pair
+maven_backend = "mvn"
+# mvnd installations by the Maven version they bundle, the versions without one are built by mvn
+mvnd_dict = {
+    "3.8.1": "",
+    "3.6.3": "",
+    "3.8.6": "",
+    "3.9.9": ""
+}
+mvnd_storage = "mvnd"
 java_find_properties = [
     "java.version",
     "java-version",